@@ -0,0 +1,362 @@
+# benchmark.py
+# ------------
+# Runs the search algorithms of search.py on the search problems of
+# searchAgents.py over every layout, without any display, and compares the
+# results of two runs.
+#
+#   python benchmark.py --output before.json
+#   ... change search.py or searchAgents.py ...
+#   python benchmark.py --output after.json
+#   python benchmark.py --compare before.json after.json
+#
+# With --grids it measures instead how fast the food Grids of the layouts are
+# hashed, copied and compared, the work the game does for every state, and how
+# fast a 1000x1000 Grid is serialized and read back.
+#
+# Every case runs in a forked process with a time and memory limit, so a
+# search which cannot finish on a layout (e.g. dfs on the food problem of
+# mediumClassic) is recorded as such instead of stalling the whole run.
+
+import optparse
+import os
+import sys
+import time
+import json
+import signal
+import resource
+import traceback
+import random
+import cPickle
+
+import game
+import layout
+import search
+import searchAgents
+from pacman import GameState
+
+ALGORITHMS = ['dfs', 'bfs', 'ucs', 'astar', 'beam']
+INFORMED = ['astar', 'beam']
+
+# problem name -> (problem class, heuristics the informed algorithms use on it)
+PROBLEMS = {
+    'position': (searchAgents.PositionSearchProblem, ['manhattanHeuristic', 'euclideanHeuristic']),
+    'corners': (searchAgents.CornersProblem, ['cornersHeuristic']),
+    'food': (searchAgents.FoodSearchProblem, ['foodHeuristic']),
+}
+
+# heuristics which read the true maze distances of mazeDistances.py
+MAZE_DISTANCE_HEURISTICS = ['cornersHeuristic', 'foodHeuristic']
+
+# measurements compared by --compare, the smallest change of each which counts
+# as a regression (so that timer noise on tiny searches is ignored) and whether
+# the --threshold applies; any growth of the path cost is a regression
+MEASUREMENTS = [('time', 0.05, True), ('expanded', 1, True), ('cost', 0, False), ('memory', 1024, True)]
+
+
+class BenchmarkTimeout(Exception):
+    pass
+
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description='Benchmark the search algorithms over the layouts')
+    parser.add_option('-o', '--output', dest='output', default='benchmark.json',
+                      help='JSON file the results are written to (default %default)')
+    parser.add_option('-l', '--layouts', dest='layouts', default=None,
+                      help='comma separated layout names (default: every layout in layouts/)')
+    parser.add_option('-a', '--algorithms', dest='algorithms', default=','.join(ALGORITHMS),
+                      help='comma separated algorithms of search.py (default %default)')
+    parser.add_option('-p', '--problems', dest='problems', default='position,corners,food',
+                      help='comma separated problems out of position, corners and food (default %default)')
+    parser.add_option('--width', dest='width', type='int', default=100,
+                      help='width of the beam of beam search (default %default)')
+    parser.add_option('--timeLimit', dest='timeLimit', type='int', default=10,
+                      help='seconds a single search may run (default %default)')
+    parser.add_option('--memoryLimit', dest='memoryLimit', type='int', default=1024,
+                      help='megabytes a single search may allocate (default %default)')
+    parser.add_option('--compare', dest='compare', nargs=2, default=None, metavar='OLD NEW',
+                      help='compare two result files instead of running the benchmark')
+    parser.add_option('--grids', dest='grids', action='store_true', default=False,
+                      help='measure the hashing throughput of Grids instead of running the searches')
+    parser.add_option('--threshold', dest='threshold', type='float', default=0.1,
+                      help='relative growth of a measurement reported as a regression (default %default)')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+def layoutNames():
+    return sorted(name[:-len('.lay')] for name in os.listdir('layouts') if name.endswith('.lay'))
+
+
+def makeCases(layouts, algorithms, problems):
+    """
+    Returns the (layout, problem, algorithm, heuristic) combinations to run,
+    with one case for every heuristic of the problem for an informed algorithm.
+    """
+    cases = []
+    for layoutName in layouts:
+        for problem in problems:
+            for algorithm in algorithms:
+                heuristics = PROBLEMS[problem][1] if algorithm in INFORMED else [None]
+                for heuristic in heuristics:
+                    cases.append((layoutName, problem, algorithm, heuristic))
+    return cases
+
+
+def caseName(case):
+    return '/'.join([part for part in case if part != None])
+
+
+def peakMemory():
+    "Peak resident memory of this process in kilobytes"
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak
+
+
+def runSearch(case, width):
+    """
+    Runs one case in the current process and returns its measurements.
+    The memory is the growth of the peak resident memory during the search.
+    The search runs without search.SearchStatistics, whose timers around
+    every call would slow some algorithms down more than others; the
+    expansions are the problem's own _expanded count. The maze distances a
+    heuristic reads are built or loaded before the clock starts, so the
+    time and memory do not depend on whether distanceCache/ is warm.
+    """
+    layoutName, problem, algorithm, heuristic = case
+    state = GameState()
+    state.initialize(layout.getLayout(layoutName), 0)
+    problemType = PROBLEMS[problem][0]
+    searchFunction = getattr(search, algorithm)
+    kwargs = {}
+    if heuristic != None:
+        kwargs['heuristic'] = getattr(searchAgents, heuristic)
+    if 'width' in searchFunction.func_code.co_varnames:
+        kwargs['width'] = width
+    if kwargs:
+        searchFunction = lambda x, searchFn=searchFunction: searchFn(x, **kwargs)
+
+    if heuristic in MAZE_DISTANCE_HEURISTICS:
+        import mazeDistances
+        mazeDistances.getMazeDistances(state.getWalls())
+
+    memory = peakMemory()
+    problem = problemType(state)
+    start = time.time()
+    actions = searchFunction(problem)
+    result = {'time': time.time() - start, 'expanded': problem._expanded,
+              'cost': problem.getCostOfActions(actions), 'memory': peakMemory() - memory}
+    result['status'] = 'ok' if actions or problem.isGoalState(problem.getStartState()) else 'no path'
+    return result
+
+
+def runCase(case, timeLimit, memoryLimit, width):
+    """
+    Runs one case in a forked process under the limits and returns its
+    measurements, or just its status if it failed.
+    """
+    readEnd, writeEnd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(readEnd)
+        # the problems print warnings about layouts which do not suit them
+        sys.stdout = open(os.devnull, 'w')
+        limit = memoryLimit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        def onTimeout(signum, frame):
+            raise BenchmarkTimeout()
+        signal.signal(signal.SIGALRM, onTimeout)
+        signal.alarm(timeLimit)
+        try:
+            result = runSearch(case, width)
+        except BenchmarkTimeout:
+            result = {'status': 'timeout'}
+        except MemoryError:
+            result = {'status': 'out of memory'}
+        except Exception:
+            result = {'status': 'error', 'error': traceback.format_exc().strip().split('\n')[-1]}
+        signal.alarm(0)
+        # the traceback of a MemoryError would keep the search's memory alive
+        sys.exc_clear()
+        os.write(writeEnd, json.dumps(result))
+        os._exit(0)
+
+    os.close(writeEnd)
+    chunks = []
+    while True:
+        chunk = os.read(readEnd, 4096)
+        if not chunk: break
+        chunks.append(chunk)
+    os.close(readEnd)
+    os.waitpid(pid, 0)
+    if not chunks:
+        return {'status': 'crashed'}
+    return json.loads(''.join(chunks))
+
+
+def runBenchmark(options):
+    layouts = options.layouts.split(',') if options.layouts else layoutNames()
+    algorithms = options.algorithms.split(',')
+    problems = options.problems.split(',')
+    for problem in problems:
+        if problem not in PROBLEMS:
+            raise Exception('Unknown problem ' + problem + '; choose from ' + ', '.join(sorted(PROBLEMS)))
+    for algorithm in algorithms:
+        if algorithm not in dir(search):
+            raise AttributeError, algorithm + ' is not a search function in search.py.'
+
+    results = {}
+    for case in makeCases(layouts, algorithms, problems):
+        result = runCase(case, options.timeLimit, options.memoryLimit, options.width)
+        results[caseName(case)] = result
+        if result['status'] == 'ok':
+            print '%-50s %8.3fs %8d expanded  cost %-6s %8d KB' % \
+                (caseName(case), result['time'], result['expanded'], result['cost'], result['memory'])
+        else:
+            print '%-50s %s' % (caseName(case), result['status'])
+        sys.stdout.flush()
+    printCostRatios(results, makeCases(layouts, algorithms, problems))
+
+    f = open(options.output, 'w')
+    json.dump({'timeLimit': options.timeLimit, 'memoryLimit': options.memoryLimit, 'width': options.width,
+               'results': results}, f, indent=1, sort_keys=True)
+    f.close()
+    print 'Results of %d cases written to %s' % (len(results), options.output)
+
+
+def rate(function, repetitions):
+    "Calls of function per second"
+    start = time.time()
+    for i in xrange(repetitions):
+        function()
+    return repetitions / max(time.time() - start, 1e-9)
+
+
+def benchmarkGrids(layouts, repetitions=20000):
+    """
+    Prints for the food Grid of every layout how many times per second it can
+    be hashed, copied with one cell changed and then hashed (as when pacman
+    eats), and compared with an equal copy and with a copy that differs in one
+    cell.
+    """
+    print '%-25s %12s %15s %12s %12s' % ('layout', 'hash/s', 'copy+set+hash/s', 'equal/s', 'unequal/s')
+    for layoutName in layouts:
+        food = layout.getLayout(layoutName).food
+        if food.count() == 0: continue
+        x, y = food.asList()[0]
+        equal, unequal = food.copy(), food.copy()
+        unequal[x][y] = False
+
+        def eat():
+            grid = food.copy()
+            grid[x][y] = False
+            hash(grid)
+        print '%-25s %12.0f %15.0f %12.0f %12.0f' % (layoutName, rate(lambda: hash(food), repetitions),
+            rate(eat, repetitions), rate(lambda: food == equal, repetitions), rate(lambda: food == unequal, repetitions))
+        sys.stdout.flush()
+
+
+def timed(function):
+    "The result of function and the seconds it took"
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+
+def benchmarkGridSerialization(size=1000):
+    """
+    Prints how long a random size x size Grid takes to be written and read
+    back in every serialized form, and how many bytes each form takes.
+    """
+    grid = game.Grid(size, size)
+    generator = random.Random(0)
+    for x in range(size):
+        grid[x] = [generator.random() < 0.5 for y in range(size)]
+    forms = [('packBits', grid.packBits, game.reconstituteGrid, lambda packed: len(packed) * 4),
+             ('toBytes', grid.toBytes, game.gridFromBytes, len),
+             ('pickle', lambda: cPickle.dumps(grid, 2), cPickle.loads, len)]
+    print '%-25s %12s %12s %12s' % ('%dx%d grid' % (size, size), 'write s', 'read s', 'bytes')
+    for name, write, read, length in forms:
+        data, writeTime = timed(write)
+        copy, readTime = timed(lambda: read(data))
+        if copy != grid:
+            raise Exception(name + ' does not read back the grid it wrote')
+        print '%-25s %12.4f %12.4f %12d' % (name, writeTime, readTime, length(data))
+
+
+def printCostRatios(results, cases):
+    """
+    Stores in each result the ratio of its path cost to the cost A* found on
+    the same layout and problem, which is optimal with the admissible
+    heuristics of searchAgents.py, and prints for every algorithm (and
+    heuristic) the mean ratio and the total time of the cases both solved.
+    """
+    optimal = {}
+    for case in cases:
+        result = results[caseName(case)]
+        if case[2] == 'astar' and result['status'] == 'ok':
+            optimal.setdefault(case[:2], result['cost'])
+
+    summary = {}
+    for case in cases:
+        result = results[caseName(case)]
+        if result['status'] != 'ok' or case[:2] not in optimal:
+            continue
+        result['costRatio'] = result['cost'] / float(optimal[case[:2]]) if optimal[case[:2]] else 1.0
+        ratios, times = summary.setdefault(caseName((case[2], case[3])), ([], []))
+        ratios.append(result['costRatio'])
+        times.append(result['time'])
+    if not summary:
+        return
+    print 'Plan cost relative to A*:'
+    for name in sorted(summary):
+        ratios, times = summary[name]
+        print '  %-30s %6.3f mean over %4d cases in %8.3fs' % (name, sum(ratios) / len(ratios), len(ratios), sum(times))
+
+
+def compareResults(oldFile, newFile, threshold):
+    """
+    Prints the cases of two result files whose measurements grew by more than
+    threshold (relative to the old value) and returns how many regressed. A
+    case that finished before but not any more is always a regression.
+    """
+    old = json.load(open(oldFile))['results']
+    new = json.load(open(newFile))['results']
+    regressions = 0
+    for name in sorted(set(old) & set(new)):
+        before, after = old[name], new[name]
+        if before['status'] == 'ok' and after['status'] != 'ok':
+            print '%-50s REGRESSION: %s, was ok' % (name, after['status'])
+            regressions += 1
+            continue
+        if before['status'] != 'ok' or after['status'] != 'ok':
+            if before['status'] != after['status']:
+                print '%-50s %s, was %s' % (name, after['status'], before['status'])
+            continue
+        for measurement, noise, relative in MEASUREMENTS:
+            a, b = before[measurement], after[measurement]
+            limit = max(noise, threshold * a) if relative else noise
+            if b - a > limit:
+                print '%-50s REGRESSION: %s %s -> %s' % (name, measurement, a, b)
+                regressions += 1
+            elif a - b > limit:
+                print '%-50s improved: %s %s -> %s' % (name, measurement, a, b)
+    for name in sorted(set(old) ^ set(new)):
+        print '%-50s only in %s' % (name, oldFile if name in old else newFile)
+    print '%d regressions beyond %d%%' % (regressions, round(threshold * 100))
+    return regressions
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    if options.compare:
+        sys.exit(1 if compareResults(options.compare[0], options.compare[1], options.threshold) else 0)
+    if options.grids:
+        benchmarkGrids(options.layouts.split(',') if options.layouts else layoutNames())
+        benchmarkGridSerialization()
+        sys.exit(0)
+    runBenchmark(options)
@@ -21,7 +21,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
-import time, os
+import time, os, random, operator, itertools, struct, binascii, string, array
 import traceback
 import sys
 
@@ -159,11 +159,88 @@ class AgentState:
     def getDirection(self):
         return self.configuration.getDirection()
 
+_zobristKeys = {}  # (width, height) -> a random key for every cell, column by column
+
+# the binary format of Grid.toBytes; bump the version whenever it changes
+GRID_MAGIC = 'GRID'
+GRID_FORMAT_VERSION = 1
+
+_CELLS_TO_BITS = string.maketrans('\x00\x01', '01')
+_BITS_TO_CELLS = string.maketrans('01', '\x00\x01')
+
+def zobristKeys(width, height):
+    """
+    The Zobrist keys of the cells of a width x height Grid. They are drawn
+    from a generator seeded with the size, so every Grid of one size, in
+    every process, hashes the same way. The keys have 63 bits rather than 64
+    so that they and their XORs stay plain ints.
+    """
+    if (width, height) not in _zobristKeys:
+        generator = random.Random(width * 65536 + height)
+        _zobristKeys[(width, height)] = [[generator.getrandbits(63) for y in range(height)] for x in range(width)]
+    return _zobristKeys[(width, height)]
+
+class GridColumn(object):
+    """
+    Column x of a Grid: a view of the cells x * height to x * height + height - 1
+    of the flat buffer of the Grid, which reads them as booleans. Setting a
+    cell to another value XORs the cell's Zobrist key into the hash of the
+    Grid, which the column shares as a one-element list (a reference to the
+    Grid itself would make a reference cycle).
+    """
+    __slots__ = ('cells', 'offset', 'height', 'keys', 'hash')
+
+    def __init__(self, cells, offset, height, keys, hash):
+        self.cells = cells
+        self.offset = offset
+        self.height = height
+        self.keys = keys
+        self.hash = hash
+
+    def _index(self, y):
+        if y < 0: y += self.height
+        if not 0 <= y < self.height: raise IndexError('grid index out of range')
+        return y
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height: y = self._index(y)
+        return self.cells[self.offset + y] == 1
+
+    def __setitem__(self, y, value):
+        if not 0 <= y < self.height: y = self._index(y)
+        value = 1 if value else 0
+        if self.cells[self.offset + y] != value:
+            self.cells[self.offset + y] = value
+            self.hash[0] ^= self.keys[y]
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return iter([cell == 1 for cell in self.cells[self.offset:self.offset + self.height]])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
+
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by one flat bytearray, column by
+    column, which holds 1 for True.  Data is accessed via grid[x][y] where
+    (x,y) are positions on a Pacman map with x horizontal, y vertical and the
+    origin (0,0) in the bottom left corner; grid[x] is a view of column x.
+    count, asList and copy work on the whole buffer at once, and asArray
+    gives it to NumPy without copying.
+
+    The hash of a Grid is the XOR of the Zobrist keys of its true cells. It is
+    kept up to date on every grid[x][y] = value, so hashing is O(1) and so is
+    setting a cell, and comparing two Grids looks at their cells only when
+    their hashes are equal.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
@@ -173,39 +250,73 @@ class Grid:
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(height)] for x in range(width)]
+        self._setCells(bytearray(chr(initialValue)) * (width * height), None if initialValue else 0)
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
-    def __getitem__(self, i):
-        return self.data[i]
-
-    def __setitem__(self, key, item):
-        self.data[key] = item
+    def _setCells(self, cells, hash=None):
+        """
+        Makes the bytearray the cells of this Grid. The hash of the cells is
+        computed unless it is given. The column views are made when first
+        used.
+        """
+        if hash == None:
+            keys = itertools.chain.from_iterable(zobristKeys(self.width, self.height))
+            hash = reduce(operator.xor, itertools.compress(keys, cells), 0)
+        self.cells = cells
+        self._hash = [hash]
+        self.columns = [None] * self.width
+        self._mazeGraph = None
+
+    def _column(self, x):
+        if x < 0: x += self.width
+        column = GridColumn(self.cells, x * self.height, self.height, zobristKeys(self.width, self.height)[x], self._hash)
+        self.columns[x] = column
+        return column
+
+    def __getitem__(self, x):
+        return self.columns[x] or self._column(x)
+
+    def __setitem__(self, x, column):
+        view = self[x]
+        for y, value in enumerate(column):
+            view[y] = value
+
+    def __getstate__(self):
+        # pickled in the binary format, without the column views
+        return self.toBytes()
+
+    def __setstate__(self, state):
+        if type(state) is dict:
+            # pickled before the binary format: the attributes, with the cells as a list of lists
+            self.CELLS_PER_INT = state.get('CELLS_PER_INT', 30)
+            self.width, self.height = state['width'], state['height']
+            self._setCells(bytearray(''.join([chr(bool(cell)) for column in state['data'] for cell in column])))
+            return
+        grid = gridFromBytes(state)
+        self.CELLS_PER_INT = grid.CELLS_PER_INT
+        self.width, self.height = grid.width, grid.height
+        self._setCells(grid.cells, grid._hash[0])
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
 
     def __eq__(self, other):
         if other == None: return False
-        return self.data == other.data
+        if self._hash[0] != other._hash[0]: return False
+        return (self.width, self.height, self.cells) == (other.width, other.height, other.cells)
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(self._hash[0])
 
     def copy(self):
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g._setCells(bytearray(self.cells), self._hash[0])
         return g
 
     def deepCopy(self):
@@ -213,17 +324,33 @@ class Grid:
 
     def shallowCopy(self):
         g = Grid(self.width, self.height)
-        g.data = self.data
+        g.cells = self.cells
+        g._hash = self._hash
+        g.columns = self.columns
         return g
 
+    def asArray(self):
+        """
+        The cells as a read-only boolean NumPy array indexed [x, y], which
+        shares the buffer of the Grid, so it follows later changes of it.
+        """
+        import numpy
+        array = numpy.frombuffer(self.cells, dtype=numpy.bool_).reshape(self.width, self.height)
+        array.flags.writeable = False
+        return array
+
     def count(self, item =True ):
-        return sum([x.count(item) for x in self.data])
+        if item not in [False, True]: return 0
+        return self.cells.count(chr(item))
 
     def asList(self, key = True):
+        if key not in [False, True]: return []
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key: list.append( (x,y) )
+        cell = chr(key)
+        index = self.cells.find(cell)
+        while index >= 0:
+            list.append(divmod(index, self.height))
+            index = self.cells.find(cell, index + 1)
         return list
 
     def packBits(self):
@@ -231,50 +358,67 @@ class Grid:
         Returns an efficient int list representation
 
         (width, height, bitPackedInts...)
+
+        Each int holds CELLS_PER_INT cells, column by column, the first in its
+        highest bit. The cells are turned into a string of '0's and '1's in
+        one go and every int is parsed from a slice of it.
         """
-        bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
-        return tuple(bits)
-
-    def _cellIndexToPosition(self, index):
-        x = index / self.height
-        y = index % self.height
-        return x, y
+        size = self.width * self.height
+        bits = str(self.cells).translate(_CELLS_TO_BITS)
+        # the last int is padded with zeros; a full last int is followed by a 0
+        bits += '0' * ((size / self.CELLS_PER_INT + 1) * self.CELLS_PER_INT - size)
+        packed = [int(bits[i:i + self.CELLS_PER_INT], 2) for i in range(0, len(bits), self.CELLS_PER_INT)]
+        return tuple([self.width, self.height] + packed)
 
     def _unpackBits(self, bits):
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
         for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
-
-    def _unpackInt(self, packed, size):
-        bools = []
-        if packed < 0: raise ValueError, "must be a positive integer"
-        for i in range(size):
-            n = 2 ** (self.CELLS_PER_INT - i - 1)
-            if packed >= n:
-                bools.append(True)
-                packed -= n
-            else:
-                bools.append(False)
-        return bools
+            if packed < 0: raise ValueError, "must be a positive integer"
+        size = self.width * self.height
+        format = '{0:0%db}' % self.CELLS_PER_INT
+        cells = ''.join([format.format(packed)[-self.CELLS_PER_INT:] for packed in bits])[:size]
+        self._setCells(bytearray(cells.translate(_BITS_TO_CELLS)) + self.cells[len(cells):])
+
+    def toBytes(self):
+        """
+        The Grid in the binary format read by gridFromBytes: 'GRID', the
+        format version as a byte, the width and the height as little-endian
+        32-bit ints and then the cells column by column, eight to a byte with
+        the first in the highest bit.
+        """
+        size = self.width * self.height
+        header = GRID_MAGIC + struct.pack('<BII', GRID_FORMAT_VERSION, self.width, self.height)
+        if size == 0:
+            return header
+        bits = str(self.cells).translate(_CELLS_TO_BITS) + '0' * (-size % 8)
+        return header + binascii.unhexlify('%0*x' % (len(bits) / 4, int(bits, 2)))
+
+def gridFromBytes(data):
+    """
+    Reads a Grid written by Grid.toBytes. Raises ValueError if data is not
+    a Grid in a version of the format this code knows.
+    """
+    headerSize = len(GRID_MAGIC) + struct.calcsize('<BII')
+    if len(data) < headerSize or not data.startswith(GRID_MAGIC):
+        raise ValueError('not a binary Grid')
+    version, width, height = struct.unpack('<BII', data[len(GRID_MAGIC):headerSize])
+    if version != GRID_FORMAT_VERSION:
+        raise ValueError('binary Grid of format version %d, expected %d' % (version, GRID_FORMAT_VERSION))
+    size = width * height
+    packed = data[headerSize:]
+    if len(packed) != (size + 7) / 8:
+        raise ValueError('binary Grid of %dx%d cells with %d bytes of cells' % (width, height, len(packed)))
+    grid = Grid(width, height)
+    if size:
+        bits = bin(int(binascii.hexlify(packed), 16))[2:].zfill(len(packed) * 8)[:size]
+        grid._setCells(bytearray(bits.translate(_BITS_TO_CELLS)))
+    return grid
 
 def reconstituteGrid(bitRep):
+    if type(bitRep) is str:
+        return gridFromBytes(bitRep)
     if type(bitRep) is not type((1,2)):
         return bitRep
     width, height = bitRep[:2]
@@ -351,15 +495,7 @@ class Actions:
     def getLegalNeighbors(position, walls):
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
-        neighbors = []
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_x = x_int + dx
-            if next_x < 0 or next_x == walls.width: continue
-            next_y = y_int + dy
-            if next_y < 0 or next_y == walls.height: continue
-            if not walls[next_x][next_y]: neighbors.append((next_x, next_y))
-        return neighbors
+        return getMazeGraph(walls).getLegalNeighbors((x_int, y_int))
     getLegalNeighbors = staticmethod(getLegalNeighbors)
 
     def getSuccessor(position, action):
@@ -368,6 +504,79 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class MazeGraph:
+    """
+    The moves between the cells of a wall Grid in compressed sparse row form,
+    built once per walls by getMazeGraph. Cell (x, y) has the id
+    x * height + y, its index in the flat buffer of the Grid, and the moves
+    out of cell i are moves[offsets[i]:offsets[i + 1]]: (next position,
+    action) pairs in the order north, south, east, west, in which the search
+    problems have always listed their successors. targets and actionCodes
+    hold the same moves as the ids of the next cells and indices into
+    ACTIONS, for code that wants numbers (numpy.frombuffer reads them).
+
+    Wall cells have moves as well, to the open cells next to them.
+    """
+    ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.wallsHash = walls._hash[0]
+        self.wallCells = bytearray(walls.cells)
+        self.offsets = array.array('i', [0])
+        self.targets = array.array('i')
+        self.actionCodes = array.array('b')
+        self.moves = []
+        for x in range(self.width):
+            for y in range(self.height):
+                for code, action in enumerate(MazeGraph.ACTIONS):
+                    dx, dy = Actions._directions[action]
+                    nextx, nexty = x + dx, y + dy
+                    if 0 <= nextx < self.width and 0 <= nexty < self.height and not walls[nextx][nexty]:
+                        self.targets.append(nextx * self.height + nexty)
+                        self.actionCodes.append(code)
+                        self.moves.append(((nextx, nexty), action))
+                self.offsets.append(len(self.moves))
+        # the slices of moves, cut once; the search problems read these
+        self.cellMoves = [self.moves[self.offsets[i]:self.offsets[i + 1]] for i in range(len(self.offsets) - 1)]
+        self._legalNeighbors = {}
+
+    def getMoves(self, position):
+        """
+        The (next position, action) pairs of the moves out of a cell. The list
+        is shared, so it must not be changed.
+        """
+        return self.cellMoves[position[0] * self.height + position[1]]
+
+    def getLegalNeighbors(self, position):
+        """
+        The cells Actions.getLegalNeighbors gives for a cell: the open ones
+        around it and the cell itself if it is open, in the order of
+        Actions._directionsAsList. Worked out once per cell.
+        """
+        if position not in self._legalNeighbors:
+            x, y = position
+            neighbors = []
+            for direction, (dx, dy) in Actions._directionsAsList:
+                nextx, nexty = x + dx, y + dy
+                if 0 <= nextx < self.width and 0 <= nexty < self.height and not self.wallCells[nextx * self.height + nexty]:
+                    neighbors.append((nextx, nexty))
+            self._legalNeighbors[position] = neighbors
+        return list(self._legalNeighbors[position])
+
+def getMazeGraph(walls):
+    """
+    The MazeGraph of a wall Grid. It is built the first time it is asked for
+    and kept on the Grid, so the graph of a Layout's walls lives as long as
+    the Layout; it is built again if the walls changed since (their hash
+    tells).
+    """
+    graph = walls._mazeGraph
+    if graph == None or graph.wallsHash != walls._hash[0]:
+        graph = walls._mazeGraph = MazeGraph(walls)
+    return graph
+
 class GameStateData:
     """
 
@@ -395,7 +604,8 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        # layouts never change, so all the states of a game share one
+        state.layout = self.layout
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -434,7 +644,7 @@ class GameStateData:
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[None for y in range(height)] for x in range(width)]
         if type(self.food) == type((1,2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -455,7 +665,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        rows = [''.join([map[x][y] for x in range(width)]) for y in range(height)]
+        rows.reverse()
+        return '\n'.join(rows) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr( self, hasFood, hasWall ):
         if hasFood:
@@ -13,15 +13,26 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, gridFromBytes, getMazeGraph
 import os
 import random
+import struct
 
 VISIBILITY_MATRIX_CACHE = {}
 
+_loaded = {}  # (absolute path, modification time) -> the Layout read from the file
+
+# the binary format of Layout.toBytes; bump the version whenever it changes
+LAYOUT_MAGIC = 'LAYT'
+LAYOUT_FORMAT_VERSION = 1
+
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    A Layout is never changed once it is made: every game state of a game
+    (and getLayout, for every game of a layout file) shares one. Use
+    deepCopy for a Layout of your own to change.
     """
 
     def __init__(self, layoutText):
@@ -46,7 +57,9 @@ class Layout:
             from game import Directions
             vecs = [(-0.5,0), (0.5,0),(0,-0.5),(0,0.5)]
             dirs = [Directions.NORTH, Directions.SOUTH, Directions.WEST, Directions.EAST]
-            vis = Grid(self.width, self.height, {Directions.NORTH:set(), Directions.SOUTH:set(), Directions.EAST:set(), Directions.WEST:set(), Directions.STOP:set()})
+            # a list of lists, since a Grid only holds booleans
+            vis = [[dict((direction, set()) for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP])
+                    for y in range(self.height)] for x in range(self.width)]
             for x in range(self.width):
                 for y in range(self.height):
                     if self.walls[x][y] == False:
@@ -55,12 +68,16 @@ class Layout:
                             nextx, nexty = x + dx, y + dy
                             while (nextx + nexty) != int(nextx) + int(nexty) or not self.walls[int(nextx)][int(nexty)] :
                                 vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
+                                nextx, nexty = nextx + dx, nexty + dy
             self.visibility = vis
             VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def getMazeGraph(self):
+        "The MazeGraph of the walls, built once and kept with them"
+        return getMazeGraph(self.walls)
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -92,6 +109,25 @@ class Layout:
     def deepCopy(self):
         return Layout(self.layoutText[:])
 
+    def toBytes(self):
+        """
+        The Layout in the binary format read by layoutFromBytes: 'LAYT', the
+        format version as a byte, the walls and the food as binary Grids
+        (see Grid.toBytes) each after its length, and then the number of
+        capsules and their positions and the number of agents and for each
+        a byte which is 1 for pacman and its position, all as little-endian
+        32-bit ints.
+        """
+        parts = [LAYOUT_MAGIC, struct.pack('<B', LAYOUT_FORMAT_VERSION)]
+        for grid in [self.walls, self.food]:
+            data = grid.toBytes()
+            parts += [struct.pack('<I', len(data)), data]
+        parts.append(struct.pack('<I', len(self.capsules)))
+        parts += [struct.pack('<II', x, y) for x, y in self.capsules]
+        parts.append(struct.pack('<I', len(self.agentPositions)))
+        parts += [struct.pack('<BII', isPacman, x, y) for isPacman, (x, y) in self.agentPositions]
+        return ''.join(parts)
+
     def processLayoutText(self, layoutText):
         """
         Coordinates are flipped from the input format to the (x,y) convention here
@@ -128,6 +164,49 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+def layoutFromBytes(data):
+    """
+    Reads a Layout written by Layout.toBytes. Its layoutText is rebuilt
+    with one character per cell, so ghosts are written as G. Raises
+    ValueError if data is not a Layout in a version of the format this
+    code knows.
+    """
+    if not data.startswith(LAYOUT_MAGIC):
+        raise ValueError('not a binary Layout')
+    offset = [len(LAYOUT_MAGIC)]
+    def read(format):
+        size = struct.calcsize(format)
+        if offset[0] + size > len(data):
+            raise ValueError('binary Layout cut short')
+        values = struct.unpack(format, data[offset[0]:offset[0] + size])
+        offset[0] += size
+        return values
+
+    version, = read('<B')
+    if version != LAYOUT_FORMAT_VERSION:
+        raise ValueError('binary Layout of format version %d, expected %d' % (version, LAYOUT_FORMAT_VERSION))
+    grids = []
+    for name in ['walls', 'food']:
+        length, = read('<I')
+        grids.append(gridFromBytes(data[offset[0]:offset[0] + length]))
+        offset[0] += length
+    walls, food = grids
+    capsules = [read('<II') for i in range(read('<I')[0])]
+    agents = [read('<BII') for i in range(read('<I')[0])]
+    if offset[0] != len(data):
+        raise ValueError('binary Layout with %d bytes too many' % (len(data) - offset[0]))
+
+    rows = [[' '] * walls.width for y in range(walls.height)]
+    for cells, char in [(walls.asList(), '%'), (food.asList(), '.'), (capsules, 'o')]:
+        for x, y in cells:
+            rows[walls.height - 1 - y][x] = char
+    for isPacman, x, y in agents:
+        rows[walls.height - 1 - y][x] = 'P' if isPacman else 'G'
+    layout = Layout([''.join(row) for row in rows])
+    # the ghosts of the text are sorted by position, the stored ones are not
+    layout.agentPositions = [(bool(isPacman), (x, y)) for isPacman, x, y in agents]
+    return layout
+
 def getLayout(name, back = 2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
@@ -144,6 +223,10 @@ def getLayout(name, back = 2):
 
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
-    f = open(fullname)
-    try: return Layout([line.strip() for line in f])
-    finally: f.close()
+    # a file is parsed once, and again only if it changed since
+    key = (os.path.abspath(fullname), os.path.getmtime(fullname))
+    if key not in _loaded:
+        f = open(fullname)
+        try: _loaded[key] = Layout([line.strip() for line in f])
+        finally: f.close()
+    return _loaded[key]
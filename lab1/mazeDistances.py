@@ -0,0 +1,215 @@
+# mazeDistances.py
+# ----------------
+# True maze distances between all pairs of open cells of a layout, computed
+# once with a breadth-first search from every cell and cached on disk, and
+# single-query distance fields computed with NumPy.
+#
+#   distances = mazeDistances.getMazeDistances(gameState.getWalls())
+#   distances.getDistance((1, 1), (5, 3))
+#   distances.getPath((1, 1), (5, 3))
+#
+#   field = mazeDistances.distanceField(walls, gameState.getGhostPositions())
+#   field[x, y]  # steps from (x, y) to the nearest ghost
+
+import os
+import hashlib
+from collections import deque
+
+import numpy
+
+from game import Directions, Actions
+
+# written next to this file; delete the directory to recompute everything
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'distanceCache')
+# bumped whenever the layout of the cached matrices changes
+CACHE_VERSION = 1
+
+# the distance stored for a pair of cells that are not connected
+UNREACHABLE = numpy.iinfo(numpy.uint16).max
+
+_loaded = {}  # key -> MazeDistances, so that every problem on a layout shares one
+
+
+class MazeDistances:
+    """
+    The maze distance between every pair of open cells of a wall Grid, as a
+    square uint16 NumPy matrix indexed by cell id. Cell ids number the open
+    cells column by column, so a lookup is two dictionary reads and an
+    array read.
+
+    The matrix is cached in CACHE_DIRECTORY under a hash of the walls, i.e.
+    of the wall part of the layout text, so layouts with the same walls and
+    different food share one file.
+    """
+
+    def __init__(self, walls, useCache=True):
+        self.walls = walls
+        self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        self.ids = dict((cell, cellId) for cellId, cell in enumerate(self.cells))
+        self.key = hashlib.sha1('%d\n%s' % (CACHE_VERSION, walls)).hexdigest()
+        self.distances = self._load() if useCache else None
+        if self.distances is None:
+            self.distances = self._compute()
+            if useCache:
+                self._save()
+
+    def _neighbors(self):
+        "The ids of the open cells next to each open cell"
+        neighbors = []
+        for x, y in self.cells:
+            around = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+            neighbors.append([self.ids[cell] for cell in around if cell in self.ids])
+        return neighbors
+
+    def _compute(self):
+        neighbors = self._neighbors()
+        size = len(self.cells)
+        distances = numpy.empty((size, size), dtype=numpy.uint16)
+        for source in range(size):
+            row = [UNREACHABLE] * size
+            row[source] = 0
+            queue = deque([source])
+            while queue:
+                cell = queue.popleft()
+                distance = row[cell] + 1
+                for neighbor in neighbors[cell]:
+                    if row[neighbor] == UNREACHABLE:
+                        row[neighbor] = distance
+                        queue.append(neighbor)
+            distances[source] = row
+        return distances
+
+    def _fileName(self):
+        return os.path.join(CACHE_DIRECTORY, self.key + '.npy')
+
+    def _load(self):
+        try:
+            distances = numpy.load(self._fileName())
+        except (IOError, ValueError):
+            return None
+        if distances.shape != (len(self.cells), len(self.cells)):
+            return None
+        return distances
+
+    def _save(self):
+        # written to a temporary file first, so a reader never sees half of it
+        temporary = '%s.%d.tmp' % (self._fileName(), os.getpid())
+        try:
+            if not os.path.isdir(CACHE_DIRECTORY):
+                os.makedirs(CACHE_DIRECTORY)
+            f = open(temporary, 'wb')
+            numpy.save(f, self.distances)
+            f.close()
+            os.rename(temporary, self._fileName())
+        except (IOError, OSError):
+            pass  # the cache is only an optimization
+
+    def getDistance(self, position1, position2):
+        """
+        The number of steps between two open cells, or infinity if they are
+        not connected.
+        """
+        distance = self.distances[self.ids[position1], self.ids[position2]]
+        if distance == UNREACHABLE:
+            return float('inf')
+        return int(distance)
+
+    def getDistances(self, position, positions):
+        "The distances from one open cell to a list of others, as a NumPy array"
+        return self.distances[self.ids[position], [self.ids[other] for other in positions]]
+
+    def getPath(self, start, goal):
+        """
+        A shortest list of actions from start to goal, found by stepping to a
+        neighbor one step closer to the goal each time. Returns [] if the goal
+        cannot be reached.
+        """
+        toGoal = self.distances[:, self.ids[goal]].tolist()
+        ids = self.ids
+        if toGoal[ids[start]] == UNREACHABLE:
+            return []
+        return descend(start, lambda position: toGoal[ids[position]] if position in ids else None)
+
+
+def descend(start, distanceAt):
+    """
+    The actions that lead from start down a distance map to a cell at
+    distance 0, stepping each time to a neighbor one step closer.
+    distanceAt gives the distance of a position, or None for a wall.
+    """
+    actions = []
+    position = start
+    distance = distanceAt(start)
+    while distance > 0:
+        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            dx, dy = Actions.directionToVector(action)
+            neighbor = (int(position[0] + dx), int(position[1] + dy))
+            if distanceAt(neighbor) == distance - 1:
+                break
+        actions.append(action)
+        position, distance = neighbor, distance - 1
+    return actions
+
+
+def wallArray(walls):
+    "A wall Grid as a boolean NumPy array indexed [x, y]"
+    return walls.asArray()
+
+
+def distanceField(walls, sources, stopAt=None):
+    """
+    The maze distance from every cell of a wall Grid to the nearest of the
+    source positions, as an int32 NumPy array indexed [x, y] which holds -1
+    for walls and for cells no source reaches.
+
+    The breadth-first search is level-synchronous: every layer is the
+    previous one shifted one step in each direction and masked by the open
+    cells without a distance, so a layer costs a few whole-array operations
+    instead of a Python loop over its cells. With stopAt, a position, the
+    search ends as soon as that cell has its distance.
+    """
+    free = ~wallArray(walls)
+    field = numpy.full(free.shape, -1, dtype=numpy.int32)
+    layer = numpy.zeros(free.shape, dtype=bool)
+    for x, y in sources:
+        layer[x, y] = free[x, y]
+    unseen = free & ~layer
+    field[layer] = 0
+    distance = 0
+    while layer.any() and (stopAt is None or field[stopAt] < 0):
+        distance += 1
+        grown = numpy.zeros(free.shape, dtype=bool)
+        grown[1:, :] |= layer[:-1, :]
+        grown[:-1, :] |= layer[1:, :]
+        grown[:, 1:] |= layer[:, :-1]
+        grown[:, :-1] |= layer[:, 1:]
+        layer = grown & unseen
+        unseen &= ~layer
+        field[layer] = distance
+    return field
+
+
+def pathAlongField(field, start):
+    """
+    A shortest list of actions from start to the nearest source of a
+    distanceField, or [] if no source can be reached.
+    """
+    if field[start] < 0:
+        return []
+    distances = field.tolist()
+    width, height = field.shape
+
+    def distanceAt(position):
+        x, y = position
+        if 0 <= x < width and 0 <= y < height and distances[x][y] >= 0:
+            return distances[x][y]
+        return None
+    return descend(start, distanceAt)
+
+
+def getMazeDistances(walls):
+    "The MazeDistances of a wall Grid, shared by every caller in this process"
+    key = str(walls)
+    if key not in _loaded:
+        _loaded[key] = MazeDistances(walls)
+    return _loaded[key]
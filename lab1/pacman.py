@@ -523,6 +523,9 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--searchStats', dest='searchStats',
+                      help='Appends statistics of every SearchAgent search as JSON lines to FILE ("-" prints them)',
+                      metavar='FILE', default=None)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -531,6 +534,9 @@ def readCommand( argv ):
 
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
+    if options.searchStats != None:
+        import search
+        search.statisticsFile = options.searchStats
 
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
@@ -626,9 +632,6 @@ def replayGame( layout, actions, display ):
     display.finish()
 
 def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
-    import __main__
-    __main__.__dict__['_display'] = display
-
     rules = ClassicGameRules(timeout)
     games = []
 
@@ -642,6 +645,9 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
+        # agents which draw on the display (e.g. the cells a search expanded) are told which it is
+        if 'setDisplay' in dir(pacman):
+            pacman.setDisplay(gameDisplay)
         game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
         game.run()
         if not beQuiet: games.append(game)
@@ -18,7 +18,13 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
-import copy
+from array import array
+from collections import OrderedDict
+import heapq
+import time
+import multiprocessing
+import Queue
+import traceback
 
 class SearchNode:
     """
@@ -60,33 +66,18 @@ class SearchNode:
         Reconstruct a path to the initial state from the current node.
         Bear in mind that usually you will reconstruct the path from the 
         final node to the initial.
+
+        The parent chain is walked iteratively and no node is copied, so the
+        path is rebuilt in linear time regardless of its length.
         """
         moves = []
-        # make a deep copy to stop any referencing isues.
-        node = copy.deepcopy(self)
-
-        if node.isRootNode():
-            # The initial state is the final state
-            return moves
-
-        "**YOUR CODE HERE**"
-        # non recursive s
-        # while not node.isRootNode():
-        #     parent = node.parent
-        #     for suc in problem.getSuccessors(parent.position):
-        #         if suc[0] == node.position:
-        #             moves.append(suc[1]) #action
-        #     node = parent
-        # moves.reverse()
-        # return moves
-
-        # recursive
-        moves = self.parent.backtrack(problem)
-        moves.append(self.transition)
+        node = self
+        while node.parent is not None:
+            moves.append(node.transition)
+            node = node.parent
+        moves.reverse()
         return moves
 
-        # util.raiseNotDefined()
-
 
 class SearchProblem:
     """
@@ -121,6 +112,17 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def getPredecessors(self, state):
+        """
+          state: Search state
+
+        Only needed by bidirectionalSearch. For a given state, this should
+        return a list of triples, (predecessor, action, stepCost), where
+        'action' leads from 'predecessor' to the given state and 'stepCost'
+        is the cost of that action.
+        """
+        util.raiseNotDefined()
+
     def getCostOfActions(self, actions):
         """
          actions: A list of actions to take
@@ -131,6 +133,27 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
+class SearchObserver:
+    """
+    Receives the events of a search problem it is given to, e.g. to draw the
+    cells a search expanded (see searchAgents.ExpandedCellsObserver). The
+    problems of searchAgents.py take one as their observer; without one they
+    keep no record of the search beyond their _expanded count.
+    """
+
+    def expanded(self, state):
+        """
+        Called every time the problem returns the successors of a state.
+        """
+        pass
+
+    def reachedGoal(self, state):
+        """
+        Called when the problem finds that a state is a goal.
+        """
+        pass
+
+
 def tinyMazeSearch(problem):
     """
     Returns a sequence of moves that solves tinyMaze.  For any other maze, the
@@ -142,6 +165,291 @@ def tinyMazeSearch(problem):
     return [s, s, w, s, w, w, s, w]
 
 
+class NodeArena:
+    """
+    Compact storage for the nodes of a single search.
+
+    Instead of one SearchNode object per node, the arena keeps the parent
+    index, path cost, heuristic value, action code and expanded flag of every
+    node in parallel arrays, and a dictionary from state to node index. There is one
+    node per state: when a state is reached again by a better path its node
+    is updated in place. Nodes are referred to by their integer index, which
+    is what the search frontiers hold.
+    """
+
+    def __init__(self):
+        self.states = []
+        self.parents = array('i')
+        self.costs = array('d')
+        self.heuristics = array('d')
+        self.actionCodes = array('H')
+        self.expanded = bytearray()
+        self.actions = []  # action code -> action
+        self.codes = {}  # action -> action code
+        self.index = {}  # state -> node index
+
+    def __len__(self):
+        return len(self.states)
+
+    def _code(self, action):
+        code = self.codes.get(action)
+        if code is None:
+            code = self.codes[action] = len(self.actions)
+            self.actions.append(action)
+        return code
+
+    def add(self, state, parent, action, cost, heuristic=0):
+        "Adds a node for a state which has not been seen yet, returns its index"
+        node = len(self.states)
+        self.states.append(state)
+        self.parents.append(parent)
+        self.costs.append(cost)
+        self.heuristics.append(heuristic)
+        self.actionCodes.append(self._code(action))
+        self.expanded.append(0)
+        self.index[state] = node
+        return node
+
+    def update(self, node, parent, action, cost):
+        "Records that the state of a node was reached through a new parent"
+        self.parents[node] = parent
+        self.costs[node] = cost
+        self.actionCodes[node] = self._code(action)
+
+    def backtrack(self, node):
+        """
+        Returns the actions leading from the root node to the given node by
+        following the parent indices iteratively.
+        """
+        parents, actionCodes, actions = self.parents, self.actionCodes, self.actions
+        moves = []
+        while parents[node] >= 0:
+            moves.append(actions[actionCodes[node]])
+            node = parents[node]
+        moves.reverse()
+        return moves
+
+
+class SearchStatistics:
+    """
+    Performance counters of a single search, collected by profile.
+
+    Collection is switched off by default and then costs nothing: search
+    functions only pass their frontiers and heuristic through watchFrontier
+    and watchHeuristic once per search, and those return them unchanged
+    unless a profile is running. The times are in seconds; peakFrontier is
+    the peak size of the largest frontier when a search uses several.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.peakFrontier = 0
+        self.duplicatePushes = 0
+        self.successorTime = 0.0
+        self.heuristicTime = 0.0
+        self.queueTime = 0.0
+        self.totalTime = 0.0
+        self.cost = None
+
+    def profile(self, searchFunction, problem):
+        """
+        Runs searchFunction on problem while collecting statistics and
+        returns its actions. Calls to getSuccessors and getPredecessors are
+        counted and timed by temporarily shadowing them on the problem.
+        """
+        global profiler
+        wrapped = [name for name in ('getSuccessors', 'getPredecessors') if name in dir(problem)]
+        for name in wrapped:
+            setattr(problem, name, self.watchExpansion(getattr(problem, name)))
+        profiler = self
+        start = time.time()
+        try:
+            actions = searchFunction(problem)
+        finally:
+            self.totalTime = time.time() - start
+            profiler = None
+            for name in wrapped:
+                delattr(problem, name)
+        if self.expanded == 0 and '_expanded' in dir(problem):
+            self.expanded = problem._expanded  # searches like jps expand without getSuccessors
+        self.cost = problem.getCostOfActions(actions)
+        return actions
+
+    def watchExpansion(self, expand):
+        def timedExpansion(state):
+            start = time.time()
+            successors = expand(state)
+            self.successorTime += time.time() - start
+            self.expanded += 1
+            self.generated += len(successors)
+            return successors
+        return timedExpansion
+
+    def watchHeuristic(self, heuristic):
+        def timedHeuristic(state, problem=None):
+            start = time.time()
+            value = heuristic(state, problem)
+            self.heuristicTime += time.time() - start
+            return value
+        return timedHeuristic
+
+    def dump(self, fileName):
+        "Appends the statistics as a line of JSON to a file, or prints it if the name is '-'"
+        import json
+        line = json.dumps(dict(self.__dict__), sort_keys=True)
+        if fileName == '-':
+            print line
+        else:
+            f = open(fileName, 'a')
+            f.write(line + '\n')
+            f.close()
+
+    def __str__(self):
+        return '\n'.join([
+            'Search statistics:',
+            '  nodes expanded: %d, generated: %d' % (self.expanded, self.generated),
+            '  peak frontier size: %d, duplicate pushes: %d' % (self.peakFrontier, self.duplicatePushes),
+            '  time: %.3fs total, %.3fs successors, %.3fs heuristic, %.3fs queue' %
+            (self.totalTime, self.successorTime, self.heuristicTime, self.queueTime),
+            '  solution cost: %s' % self.cost])
+
+
+class WatchedFrontier(object):
+    """
+    Forwards every call to a frontier, timing its pushes and pops and tracking
+    its size and the items pushed more than once for a SearchStatistics.
+    """
+
+    def __init__(self, frontier, statistics):
+        self.frontier = frontier
+        self.statistics = statistics
+        self.items = frontier.heap if 'heap' in dir(frontier) else frontier.list
+        self.pushed = set()
+
+    def __getattr__(self, name):
+        return getattr(self.frontier, name)
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def _timed(self, operation, *args):
+        statistics = self.statistics
+        start = time.time()
+        result = operation(*args)
+        statistics.queueTime += time.time() - start
+        statistics.peakFrontier = max(statistics.peakFrontier, len(self.items))
+        return result
+
+    def push(self, *args):
+        if args[0] in self.pushed:
+            self.statistics.duplicatePushes += 1
+        else:
+            self.pushed.add(args[0])
+        return self._timed(self.frontier.push, *args)
+
+    def pop(self):
+        return self._timed(self.frontier.pop)
+
+    def remove(self, item):
+        return self._timed(self.frontier.remove, item)
+
+
+profiler = None  # the SearchStatistics of the search being profiled, if any
+statisticsFile = None  # where SearchAgent dumps the statistics of its searches, if anywhere
+
+
+def watchFrontier(frontier):
+    "Returns the frontier, watched by the running profile if there is one"
+    if profiler is None:
+        return frontier
+    return WatchedFrontier(frontier, profiler)
+
+
+def watchHeuristic(heuristic):
+    "Returns the heuristic, timed by the running profile if there is one"
+    if profiler is None or heuristic is None:
+        return heuristic
+    return profiler.watchHeuristic(heuristic)
+
+
+def graphSearchEvents(problem, makeFrontier, heuristic=None, duplicates=False, unitCost=False):
+    """
+    Generic graph search shared by all of the search functions below, as a
+    generator which yields an event for every node taken off the frontier:
+
+      (state, cost, f, frontierSize, actions)
+
+    cost is the path cost counted by the search (the depth for BFS), f the
+    cost plus the heuristic and frontierSize the number of entries left on
+    the frontier. actions is None except in the last event, which is for a
+    goal and holds the actions reaching it. Callers can stream the events to
+    a display or a log, or stop the search by not asking for more.
+
+      makeFrontier: a function from the NodeArena of the search to an empty
+                  util.Stack, util.Queue or util.IndexedPriorityQueueWithFunction
+                  holding node indices, which decides the order of expansion.
+                  The priority function of a queue reads the arena's arrays.
+      heuristic:  evaluated once for every state and stored in the arena
+                  (None for the uninformed searches)
+      duplicates: when True, a state which is already on the frontier is pushed
+                  again whenever it is generated (needed by DFS, where the newest
+                  copy has to be expanded first). Otherwise it is only pushed
+                  again if it was reached with a strictly lower cost.
+      unitCost:   count every action as 1 instead of its step cost (BFS)
+
+    The arena maps states to nodes and flags the expanded ones, so every
+    membership check is O(1). States must therefore be hashable.
+    """
+    nodes = NodeArena()
+    frontier = watchFrontier(makeFrontier(nodes))
+    heuristic = watchHeuristic(heuristic)
+    states, index, costs, heuristics, expanded = nodes.states, nodes.index, nodes.costs, nodes.heuristics, nodes.expanded
+
+    start = problem.getStartState()
+    frontier.push(nodes.add(start, -1, None, 0, heuristic(start, problem) if heuristic else 0))
+
+    while not frontier.isEmpty():
+        current = frontier.pop()
+        if expanded[current]:
+            # a stale duplicate of an already expanded node
+            continue
+        state = states[current]
+        cost = costs[current]
+        if problem.isGoalState(state):
+            yield state, cost, cost + heuristics[current], len(frontier), nodes.backtrack(current)
+            return
+        yield state, cost, cost + heuristics[current], len(frontier), None
+        expanded[current] = 1
+
+        # child x,y,z: x is position, y action, z cost
+        for child, action, stepCost in problem.getSuccessors(state):
+            childCost = cost + (1 if unitCost else stepCost)
+            node = index.get(child)
+            if node is None:
+                h = heuristic(child, problem) if heuristic else 0
+                frontier.push(nodes.add(child, current, action, childCost, h))
+            elif not expanded[node] and (duplicates or childCost < costs[node]):
+                nodes.update(node, current, action, childCost)
+                frontier.push(node)
+
+
+def pathToGoal(events):
+    """
+    Consumes search events and returns the actions of the goal event, or []
+    if the search ended without reaching a goal.
+    """
+    for state, cost, f, frontierSize, actions in events:
+        if actions is not None:
+            return actions
+    return []
+
+
+def depthFirstSearchEvents(problem):
+    "The expansion events of depthFirstSearch, see graphSearchEvents"
+    return graphSearchEvents(problem, lambda nodes: util.Stack(), duplicates=True)
+
+
 def depthFirstSearch(problem):
     """
     Search the deepest nodes in the search tree first.
@@ -156,73 +464,78 @@ def depthFirstSearch(problem):
     print "Is the start a goal?", problem.isGoalState(problem.getStartState())
     print "Start's successors:", problem.getSuccessors(problem.getStartState())
     """
-    open = util.Stack()
-    open.push(SearchNode(problem.getStartState(), None, "Stop", 0, 0))
-    closed = []
-
-    while not open.isEmpty():
-        current = open.pop()
-        if problem.isGoalState(current.position):
-            return current.backtrack(problem)
+    return pathToGoal(depthFirstSearchEvents(problem))
 
-        if current not in closed:
-            closed.append(current.position)
 
-            # child x,y,z: x is position, y action, z cost
-            for child in problem.getSuccessors(current.position):
-                if child[0] not in closed:
-                    open.push(SearchNode(child[0], current, child[1], 0))
-    return []
+def breadthFirstSearchEvents(problem):
+    "The expansion events of breadthFirstSearch, see graphSearchEvents"
+    return graphSearchEvents(problem, lambda nodes: util.Queue(), unitCost=True)
 
 
 def breadthFirstSearch(problem):
     """Search the shallowest nodes in the search tree first."""
-    open = util.Queue()
-    open.push(SearchNode(problem.getStartState(), None, "Stop", 0, 0))
-    closed = []
-
-    while not open.isEmpty():
-        current = open.pop()
-        if problem.isGoalState(current.position):
-            return current.backtrack(problem)
-
-        if current not in closed:
-            closed.append(current.position)
-
-            # child x,y,z: x is position, y action, z cost
-            for child in problem.getSuccessors(current.position):
-                if child[0] not in closed:
-                    seen = False
-                    for it in open.list:
-                        if it.position == child[0]:
-                            seen = True
-                    if not seen:
-                        open.push(SearchNode(child[0], current, child[1], 0))
-    return []
+    return pathToGoal(breadthFirstSearchEvents(problem))
+
+
+def uniformCostSearchEvents(problem):
+    "The expansion events of uniformCostSearch, see graphSearchEvents"
+    makeFrontier = lambda nodes: util.IndexedPriorityQueueWithFunction(nodes.costs.__getitem__)
+    return graphSearchEvents(problem, makeFrontier)
 
 
 def uniformCostSearch(problem):
     """Search the node of least total cost first."""
     "*** YOUR CODE HERE ***"
-    open = util.PriorityQueue()
-    open.push(SearchNode(problem.getStartState(), None, "Stop", 0, 0), 0)
-    closed = []
-    closedPositions = []
-
-    while not open.isEmpty():
-        current = open.pop()
-        if problem.isGoalState(current.position):
-            return current.backtrack(problem)
-
-        if current.position not in closedPositions:
-            closedPositions.append(current.position)
-            closed.append(current)
-
-            # child x,y,z: x is position, y action, z cost
-            for child in problem.getSuccessors(current.position):
-                if child[0] not in closedPositions:
-                    open.push(SearchNode(child[0], current, child[1], child[2]+current.cost), child[2]+current.cost)
-    return []
+    return pathToGoal(uniformCostSearchEvents(problem))
+
+
+def iterativeDeepeningSearch(problem, maxNodes=100000):
+    """
+    Repeated depth-first searches with a depth limit that grows by one after
+    every iteration, returning a path with the fewest actions while the
+    frontier only holds the current path.
+
+    A transposition table of at most maxNodes states keeps the shallowest
+    depth at which each state was reached in the current iteration; reaching
+    a state again no shallower cannot lead to a goal any earlier, so cycles
+    and transpositions are not explored twice. The largest number of stored
+    states is left in problem._peakNodes.
+    """
+    start = problem.getStartState()
+    problem._peakNodes = 1
+    if problem.isGoalState(start):
+        return []
+
+    limit = 1
+    while True:
+        # whether a node was left unexpanded at the depth limit
+        cutoff = False
+        seen = {start: 0}
+        actions = []
+        stack = [iter(problem.getSuccessors(start))]
+        while stack:
+            depth = len(stack)
+            for child, action, stepCost in stack[-1]:
+                if child in seen and seen[child] <= depth:
+                    continue
+                if child in seen or len(seen) < maxNodes:
+                    seen[child] = depth
+                actions.append(action)
+                if problem.isGoalState(child):
+                    return actions
+                if depth < limit:
+                    stack.append(iter(problem.getSuccessors(child)))
+                    problem._peakNodes = max(problem._peakNodes, len(seen) + len(stack))
+                    break
+                cutoff = True
+                actions.pop()
+            else:
+                stack.pop()
+                if stack:
+                    actions.pop()
+        if not cutoff:
+            return []
+        limit += 1
 
 
 def nullHeuristic(state, problem=None):
@@ -233,34 +546,659 @@ def nullHeuristic(state, problem=None):
     return 0
 
 
+class HeuristicCache:
+    """
+    Memoizes a heuristic for the states of a single search.
+
+    At most maxSize values are kept; once the cache is full the least
+    recently used value is evicted. hits and misses count the lookups.
+    graphSearchEvents already evaluates the heuristic once per state, so the cache
+    pays off for searches which revisit states, such as
+    iterativeDeepeningAStarSearch. SearchAgent wraps its heuristic in one only
+    when it is given a cacheSize above 0.
+    """
+
+    def __init__(self, heuristic, maxSize=100000):
+        self.heuristic = heuristic
+        self.maxSize = maxSize
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, state, problem=None):
+        values = self.values
+        if state in values:
+            self.hits += 1
+            value = values.pop(state)
+            values[state] = value
+            return value
+        self.misses += 1
+        value = values[state] = self.heuristic(state, problem)
+        if len(values) > self.maxSize:
+            values.popitem(last=False)
+        return value
+
+
+def aStarSearchEvents(problem, heuristic=nullHeuristic):
+    "The expansion events of aStarSearch, see graphSearchEvents"
+    def makeFrontier(nodes):
+        costs, heuristics = nodes.costs, nodes.heuristics
+        return util.IndexedPriorityQueueWithFunction(lambda node: costs[node] + heuristics[node])
+    return graphSearchEvents(problem, makeFrontier, heuristic)
+
+
 def aStarSearch(problem, heuristic=nullHeuristic): #default: nullHeuristic
     """Search the node that has the lowest combined cost and heuristic first."""
     "*** YOUR CODE HERE ***"
-    open = util.PriorityQueue()
-    open.push(SearchNode(problem.getStartState(), None, "Stop", 0, 0), 0)
-    closed = []
-    closedPositions = []
-
-    while not open.isEmpty():
-        current = open.pop()
-        if problem.isGoalState(current.position):
-            return current.backtrack(problem)
-
-        if current.position not in closedPositions:
-            closedPositions.append(current.position)
-            closed.append(current)
-
-            # child x,y,z: x is position, y action, z cost
-            for child in problem.getSuccessors(current.position):
-
-                if child[0] not in closedPositions:
-                    sn = SearchNode(child[0], current, child[1], child[2] + current.cost, heuristic(child[0], problem))
-                    open.push(sn, child[2] + current.cost+ heuristic(child[0], problem))
+    return pathToGoal(aStarSearchEvents(problem, heuristic))
+
+
+def iterativeDeepeningAStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    Repeated depth-first searches which cut off every path whose cost plus
+    heuristic exceeds a bound, raising the bound to the lowest value that was
+    cut off until a goal is found (IDA*).
+
+    Besides the current path, at most maxNodes states are remembered: a
+    transposition table with the cheapest cost at which each state was
+    reached in the current iteration (reaching a state again at no lower
+    cost cannot lead anywhere new), and a HeuristicCache shared by all of the
+    iterations. The largest number of stored states, the path and both of
+    these counted, is left in problem._peakNodes; a HeuristicCache passed in
+    as the heuristic belongs to the caller and is not counted.
+    """
+    cached = {}
+    if not isinstance(heuristic, HeuristicCache):
+        heuristic = HeuristicCache(heuristic, maxNodes)
+        cached = heuristic.values
+    heuristic = watchHeuristic(heuristic)
+    start = problem.getStartState()
+    problem._peakNodes = 1
+    if problem.isGoalState(start):
+        return []
+
+    bound = heuristic(start, problem)
+    while bound < float('inf'):
+        nextBound = float('inf')
+        seen = {start: 0}
+        actions = []
+        stack = [(0, iter(problem.getSuccessors(start)))]
+        while stack:
+            cost, successors = stack[-1]
+            for child, action, stepCost in successors:
+                childCost = cost + stepCost
+                if child in seen and seen[child] <= childCost:
+                    continue
+                f = childCost + heuristic(child, problem)
+                if f > bound:
+                    nextBound = min(nextBound, f)
+                    continue
+                if child in seen or len(seen) < maxNodes:
+                    seen[child] = childCost
+                actions.append(action)
+                if problem.isGoalState(child):
+                    return actions
+                stack.append((childCost, iter(problem.getSuccessors(child))))
+                problem._peakNodes = max(problem._peakNodes, len(seen) + len(stack) + len(cached))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    actions.pop()
+        bound = nextBound
+    return []
+
+
+class BoundedSearchNode(SearchNode):
+    """
+    A SearchNode of simplifiedMemoryBoundedAStarSearch. Besides the usual
+    values it knows its children which are still in memory and the backed up
+    f values of the children which had to be forgotten, by position.
+    """
+
+    def __init__(self, position, parent, transition, cost, f):
+        SearchNode.__init__(self, position, parent, transition, cost, f - cost)
+        self.f = f
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.children = {}
+        self.forgotten = {}
+
+
+def simplifiedMemoryBoundedAStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    A* which keeps at most maxNodes search nodes in memory (SMA*), plus the
+    successors of the node being expanded until the excess is forgotten.
+
+    When memory is full, the leaf with the highest f value is forgotten and
+    its f value is backed up into its parent, which goes back to the frontier
+    so that the forgotten subtree can be regenerated once it looks promising
+    again; a regenerated child starts from its backed up value. f values are
+    kept monotone along paths (pathmax). A node too deep to be extended with
+    maxNodes nodes gets an f value of infinity, which is backed up like any
+    other, so a subtree which cannot fit is never regenerated and the search
+    gives up, returning [], once no subtree can. The solution is optimal if
+    the optimal path fits in memory. The largest number of stored nodes is
+    left in problem._peakNodes.
+    """
+    heuristic = watchHeuristic(heuristic)
+    start = problem.getStartState()
+    root = BoundedSearchNode(start, None, None, 0, heuristic(start, problem))
+    # the frontier holds the nodes with successors which are not in memory
+    frontier = watchFrontier(util.IndexedPriorityQueue())
+    frontier.push(root, (root.f, 0))
+    # the leaves are the candidates for being forgotten
+    leaves = util.IndexedPriorityQueue()
+    leaves.push(root, (-root.f, 0))
+    cheapest = {start: root}
+    stored = problem._peakNodes = 1
+
+    def forget(node):
+        """
+        Removes a leaf from memory and backs its f value up into its parent.
+        A parent left without any way forward is forgotten as well. Returns
+        the number of nodes removed.
+        """
+        frontier.remove(node)
+        leaves.remove(node)
+        if cheapest.get(node.position) is node:
+            del cheapest[node.position]
+        parent = node.parent
+        del parent.children[node.position]
+        parent.forgotten[node.position] = node.f
+        forgotten = min(parent.forgotten.values())
+        if forgotten < float('inf'):
+            frontier.push(parent, (forgotten, -parent.depth))
+        if parent.children:
+            return 1
+        parent.f = max(parent.f, forgotten)
+        if parent.f == float('inf') and parent.parent is not None:
+            return 1 + forget(parent)
+        leaves.push(parent, (-parent.f, parent.depth))
+        return 1
+
+    while not frontier.isEmpty():
+        if frontier.getPriority(frontier.peek())[0] == float('inf'):
+            # the optimal solution does not fit in memory
+            break
+        node = frontier.pop()
+        if problem.isGoalState(node.position):
+            return node.backtrack(problem)
+
+        # the children known not to fit stay forgotten, the others are regenerated
+        forgotten = node.forgotten
+        node.forgotten = dict([(child, f) for child, f in forgotten.items() if f == float('inf')])
+        if node.depth + 1 < maxNodes:
+            for child, action, stepCost in problem.getSuccessors(node.position):
+                cost = node.cost + stepCost
+                if child in node.children or child in node.forgotten or (child in cheapest and cheapest[child].cost <= cost):
+                    continue
+                f = max(node.f, cost + heuristic(child, problem), forgotten.get(child, 0))
+                childNode = BoundedSearchNode(child, node, action, cost, f)
+                node.children[child] = cheapest[child] = childNode
+                frontier.push(childNode, (f, -childNode.depth))
+                leaves.push(childNode, (-f, childNode.depth))
+                stored += 1
+
+        if node.children:
+            leaves.remove(node)
+        elif node.parent is not None:
+            # a dead end, or too deep to be extended with the memory available
+            node.f = float('inf')
+            stored -= forget(node)
+        problem._peakNodes = max(problem._peakNodes, stored)
+
+        while stored > maxNodes:
+            stored -= forget(leaves.peek())
     return []
 
 
+def beamSearch(problem, heuristic=nullHeuristic, width=100):
+    """
+    Breadth-first search which keeps only the width nodes of every depth layer
+    with the lowest heuristic values (ties are broken by path cost), giving up
+    optimality and completeness for a frontier that never holds more than
+    width nodes. The nodes of the earlier layers stay in memory for the path,
+    and a state that was kept once is never kept again, so the beam cannot
+    run in cycles.
+    """
+    heuristic = watchHeuristic(heuristic)
+    nodes = NodeArena()
+    states, index, costs = nodes.states, nodes.index, nodes.costs
+    start = problem.getStartState()
+    layer = [nodes.add(start, -1, None, 0, heuristic(start, problem))]
+
+    while layer:
+        # the cheapest way of reaching each new state from this layer
+        candidates = {}
+        for current in layer:
+            state = states[current]
+            if problem.isGoalState(state):
+                return nodes.backtrack(current)
+            cost = costs[current]
+            for child, action, stepCost in problem.getSuccessors(state):
+                if child in index:
+                    continue
+                childCost = cost + stepCost
+                candidate = candidates.get(child)
+                if candidate is None:
+                    candidates[child] = (heuristic(child, problem), childCost, current, action)
+                elif childCost < candidate[1]:
+                    candidates[child] = (candidate[0], childCost, current, action)
+        best = heapq.nsmallest(width, candidates.iteritems(), key=lambda candidate: candidate[1][:2])
+        layer = [nodes.add(child, parent, action, childCost, h) for child, (h, childCost, parent, action) in best]
+    return []
+
+
+_unitCostGrids = {}  # (code of the cost function, hash of the walls) -> isUnitCostGrid
+
+def isUnitCostGrid(problem):
+    """
+    Checks whether the problem is a search over the positions of a walls Grid
+    where every step costs 1, like PositionSearchProblem with its default
+    cost function.
+
+    The check calls the cost function on every open cell, so its answer is
+    remembered for cost functions which depend on nothing but their argument
+    (no closure or default arguments, like lambda x: 1): every problem made
+    with such a function on the same walls shares one check.
+    """
+    if 'walls' not in dir(problem) or 'costFn' not in dir(problem):
+        return False
+    costFn = problem.costFn
+    key = None
+    if getattr(costFn, 'func_closure', True) == None and not costFn.func_defaults:
+        key = (costFn.func_code, hash(problem.walls))
+        if key in _unitCostGrids:
+            return _unitCostGrids[key]
+    unitCost = all(costFn(cell) == 1 for cell in problem.walls.asList(False))
+    if key != None:
+        _unitCostGrids[key] = unitCost
+    return unitCost
+
+
+def jump(problem, walls, x, y, dx, dy):
+    """
+    Moves from (x, y) in the direction (dx, dy) until reaching a jump point:
+    a goal, a cell with a forced neighbour (a side cell which is open only
+    because the cell behind it is a wall) or, when moving vertically, a cell
+    from which a horizontal jump finds a jump point. Returns None on reaching
+    a wall first.
+    """
+    while True:
+        x, y = x + dx, y + dy
+        if walls[x][y]:
+            return None
+        if problem.isGoalState((x, y)):
+            return x, y
+        if dx:
+            if (not walls[x][y - 1] and walls[x - dx][y - 1]) or (not walls[x][y + 1] and walls[x - dx][y + 1]):
+                return x, y
+        else:
+            if (not walls[x - 1][y] and walls[x - 1][y - dy]) or (not walls[x + 1][y] and walls[x + 1][y - dy]):
+                return x, y
+            if jump(problem, walls, x, y, 1, 0) or jump(problem, walls, x, y, -1, 0):
+                return x, y
+
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    A* over the jump points of a 4-connected grid with unit step costs (JPS).
+
+    Instead of generating every neighbour, each expansion jumps in a straight
+    line, away from the parent, until something forces a decision (see jump).
+    The cells passed on the way are never stored, which prunes the many
+    symmetric shortest paths of open areas. problem._expanded counts the
+    expanded jump points.
+
+    Works on problems with walls and costFn, such as PositionSearchProblem
+    and AnyFoodSearchProblem; falls back to aStarSearch when some step does
+    not cost 1 (e.g. StayEastSearchAgent) or the problem is not a grid.
+    """
+    if not isUnitCostGrid(problem):
+        return aStarSearch(problem, heuristic)
+    from game import Directions
+    directions = [(Directions.NORTH, 0, 1), (Directions.SOUTH, 0, -1),
+                  (Directions.EAST, 1, 0), (Directions.WEST, -1, 0)]
+    walls = problem.walls
+    heuristic = watchHeuristic(heuristic)
+
+    nodes = NodeArena()
+    states, parents, costs, heuristics = nodes.states, nodes.parents, nodes.costs, nodes.heuristics
+    frontier = watchFrontier(util.IndexedPriorityQueueWithFunction(lambda node: costs[node] + heuristics[node]))
+    start = problem.getStartState()
+    frontier.push(nodes.add(start, -1, None, 0, heuristic(start, problem)))
+
+    while not frontier.isEmpty():
+        current = frontier.pop()
+        nodes.expanded[current] = 1
+        x, y = states[current]
+        if problem.isGoalState((x, y)):
+            return unfoldJumps(nodes, current)
+        problem._expanded += 1
+
+        if parents[current] >= 0:
+            px, py = states[parents[current]]
+            backward = (cmp(px, x), cmp(py, y))
+        else:
+            backward = None
+        for action, dx, dy in directions:
+            if (dx, dy) == backward:
+                continue
+            jumpPoint = jump(problem, walls, x, y, dx, dy)
+            if jumpPoint is None:
+                continue
+            cost = costs[current] + abs(jumpPoint[0] - x) + abs(jumpPoint[1] - y)
+            node = nodes.index.get(jumpPoint)
+            if node is None:
+                frontier.push(nodes.add(jumpPoint, current, action, cost, heuristic(jumpPoint, problem)))
+            elif not nodes.expanded[node] and cost < costs[node]:
+                nodes.update(node, current, action, cost)
+                frontier.push(node)
+    return []
+
+
+def unfoldJumps(nodes, node):
+    """
+    Returns the actions leading to a node of jumpPointSearch, repeating the
+    action of every jump once for each cell it crosses.
+    """
+    states, parents = nodes.states, nodes.parents
+    moves = []
+    while parents[node] >= 0:
+        (x, y), (px, py) = states[node], states[parents[node]]
+        moves.extend([nodes.actions[nodes.actionCodes[node]]] * (abs(x - px) + abs(y - py)))
+        node = parents[node]
+    moves.reverse()
+    return moves
+
+
+def anytimeRepairingAStarSolutions(problem, heuristic=nullHeuristic, weight=3.0, weightStep=0.5, deadline=None):
+    """
+    Generates successively cheaper solutions (ARA*), as pairs of a list of
+    actions and a bound on how many times costlier than optimal it can be.
+
+    The first solution is found by A* with the heuristic inflated by weight.
+    Then the weight is lowered by weightStep down to 1, each time reusing the
+    search effort made so far: only states whose cost improved since their
+    last expansion are expanded again. The last solution has bound 1. A
+    weight which improves neither the cost nor the bound generates nothing.
+
+    deadline is a time.time() value at which to stop. It only cuts short the
+    improvement of an existing solution, so at least one is always generated
+    if the goal is reachable.
+    """
+    nodes = NodeArena()
+    states, costs, heuristics, index = nodes.states, nodes.costs, nodes.heuristics, nodes.index
+    weights = [weight]
+    makeFrontier = lambda: watchFrontier(
+        util.IndexedPriorityQueueWithFunction(lambda node: costs[node] + weights[0] * heuristics[node]))
+    heuristic = watchHeuristic(heuristic)
+
+    frontier = makeFrontier()
+    start = problem.getStartState()
+    frontier.push(nodes.add(start, -1, None, 0, heuristic(start, problem)))
+    best, solution = (0, 0) if problem.isGoalState(start) else (float('inf'), None)
+    inconsistent = set()
+    last = None
+
+    while True:
+        # expanded is reset for every weight, so it marks the nodes closed in this iteration
+        nodes.expanded = expanded = bytearray(len(nodes))
+        while not frontier.isEmpty() and frontier.getPriority(frontier.peek()) < best:
+            if deadline is not None and solution is not None and time.time() > deadline:
+                return
+            current = frontier.pop()
+            expanded[current] = 1
+            cost = costs[current]
+            for child, action, stepCost in problem.getSuccessors(states[current]):
+                childCost = cost + stepCost
+                node = index.get(child)
+                if node is None:
+                    node = nodes.add(child, current, action, childCost, heuristic(child, problem))
+                elif childCost < costs[node]:
+                    nodes.update(node, current, action, childCost)
+                else:
+                    continue
+                if childCost < best and problem.isGoalState(child):
+                    best, solution = childCost, node
+                if expanded[node]:
+                    inconsistent.add(node)
+                else:
+                    frontier.push(node)
+
+        if solution is None:
+            return
+        pending = [entry[3] for entry in frontier.heap] + list(inconsistent)
+        lowest = min([costs[node] + heuristics[node] for node in pending] or [best])
+        bound = max(1.0, min(weights[0], best / lowest)) if lowest > 0 else 1.0
+        if (best, bound) != last:
+            yield nodes.backtrack(solution), bound
+            last = best, bound
+        if weights[0] <= 1 or not pending:
+            return
+
+        weights[0] = max(1.0, weights[0] - weightStep)
+        frontier = makeFrontier()
+        for node in pending:
+            frontier.push(node)
+        inconsistent = set()
+
+
+def anytimeRepairingAStarSearch(problem, heuristic=nullHeuristic, deadline=None, weight=3.0, weightStep=0.5):
+    """
+    Returns the best solution found by anytimeRepairingAStarSolutions within
+    deadline seconds, or the optimal one if there is no deadline. The
+    suboptimality bound of the returned solution is left in
+    problem._suboptimalityBound.
+    """
+    if deadline is not None:
+        deadline = time.time() + deadline
+    actions = []
+    for actions, bound in anytimeRepairingAStarSolutions(problem, heuristic, weight, weightStep, deadline):
+        problem._suboptimalityBound = bound
+    return actions
+
+
+def bidirectionalSearch(problem):
+    """
+    Search from the start state and back from the goal state at the same time,
+    always expanding the side whose cheapest frontier node is cheaper.
+
+    The problem must have a single goal, problem.goal, and provide
+    getPredecessors. Every time a state is reached by one side, the cost of
+    the best path through it is checked against the other side. The search
+    stops once the two cheapest frontier nodes together cost no less than the
+    best such path, so the returned path is optimal for non-negative costs.
+    """
+    start, goal = problem.getStartState(), problem.goal
+    if problem.isGoalState(start):
+        return []
+
+    forward, backward = NodeArena(), NodeArena()
+    sides = []
+    for nodes, root, expand in (forward, start, problem.getSuccessors), (backward, goal, problem.getPredecessors):
+        frontier = watchFrontier(util.IndexedPriorityQueueWithFunction(nodes.costs.__getitem__))
+        frontier.push(nodes.add(root, -1, None, 0))
+        sides.append((nodes, frontier, expand))
+    (_, forwardFrontier, _), (_, backwardFrontier, _) = sides
+
+    best, meeting = float('inf'), None
+    while not forwardFrontier.isEmpty() and not backwardFrontier.isEmpty():
+        forwardMin = forward.costs[forwardFrontier.peek()]
+        backwardMin = backward.costs[backwardFrontier.peek()]
+        if forwardMin + backwardMin >= best:
+            break
+        nodes, frontier, expand = sides[0] if forwardMin <= backwardMin else sides[1]
+        other = backward if nodes is forward else forward
+
+        current = frontier.pop()
+        nodes.expanded[current] = 1
+        cost = nodes.costs[current]
+        for child, action, stepCost in expand(nodes.states[current]):
+            childCost = cost + stepCost
+            node = nodes.index.get(child)
+            if node is None:
+                frontier.push(nodes.add(child, current, action, childCost))
+            elif not nodes.expanded[node] and childCost < nodes.costs[node]:
+                nodes.update(node, current, action, childCost)
+                frontier.push(node)
+            else:
+                continue
+            if child in other.index and childCost + other.costs[other.index[child]] < best:
+                best, meeting = childCost + other.costs[other.index[child]], child
+
+    if meeting is None:
+        return []
+    # the backward arena is rooted at the goal, so its path is read in reverse
+    toGoal = backward.backtrack(backward.index[meeting])
+    toGoal.reverse()
+    return forward.backtrack(forward.index[meeting]) + toGoal
+
+
+def distanceFieldSearch(problem):
+    """
+    Breadth-first search a whole layer at a time with NumPy: the distance
+    field of the goal cells (see mazeDistances.distanceField) grows until it
+    reaches the start, and the path follows it downhill to the nearest goal.
+    problem._expanded counts the cells which got a distance.
+
+    Works on problems with walls and costFn, such as PositionSearchProblem
+    and AnyFoodSearchProblem; falls back to uniformCostSearch when some step
+    does not cost 1 or the problem is not a grid. The goal cells are the
+    food of a problem with food, the goal of one with a goal, and otherwise
+    every open cell isGoalState accepts.
+
+    Every layer costs whole-array operations over the grid, so this beats
+    breadthFirstSearch only when the goals are far away in an open layout
+    (openMaze); when a goal is a few steps from the start, as for the
+    closest dot, plain bfs is much faster.
+    """
+    if not isUnitCostGrid(problem):
+        return uniformCostSearch(problem)
+    import mazeDistances
+    walls = problem.walls
+    start = problem.getStartState()
+    if 'food' in dir(problem):
+        goals = problem.food.asList()
+    elif 'goal' in dir(problem):
+        goals = [problem.goal]
+    else:
+        goals = [cell for cell in walls.asList(False) if problem.isGoalState(cell)]
+    field = mazeDistances.distanceField(walls, goals, stopAt=start)
+    problem._expanded += int((field >= 0).sum())
+    return mazeDistances.pathAlongField(field, start)
+
+
+def portfolioConfigurations(heuristic=nullHeuristic):
+    """
+    The default configurations of portfolioSearch as (name, search function,
+    optimal) triples. A* and JPS are optimal when the heuristic is admissible.
+    """
+    return [('astar', lambda problem: aStarSearch(problem, heuristic), True),
+            ('jps', lambda problem: jumpPointSearch(problem, heuristic), True),
+            ('ucs', uniformCostSearch, True),
+            ('bfs', breadthFirstSearch, False),
+            ('beam', lambda problem: beamSearch(problem, heuristic), False)]
+
+
+def runConfiguration(index, searchFunction, problem, results):
+    """
+    Runs in a worker process of portfolioSearch and reports back to it, with
+    the formatted traceback if the search raised an exception.
+    """
+    error = None
+    try:
+        actions = searchFunction(problem)
+    except Exception:
+        actions, error = None, traceback.format_exc()
+    results.put((index, actions, problem._expanded if '_expanded' in dir(problem) else 0, error))
+
+
+def portfolioSearch(problem, heuristic=nullHeuristic, deadline=None, optimal=False, configurations=None,
+                    processes=None):
+    """
+    Runs several search configurations on the problem in worker processes and
+    returns the first non-empty plan, terminating the other workers.
+
+      configurations: (name, search function, optimal) triples, by default
+                      portfolioConfigurations(heuristic)
+      optimal:        only accept a plan from an optimal configuration; the
+                      first other plan is returned if every one of them fails
+      deadline:       seconds after which the best plan so far (or []) is
+                      returned
+      processes:      how many configurations run at the same time (all of
+                      them by default)
+
+    The workers are forked, so neither the problem nor the search functions
+    have to be picklable, and they are terminated however this returns,
+    including when Game's startup timeout interrupts it. A configuration
+    which raises an exception has its traceback printed and counts as
+    failed. The name of the winning configuration is left in
+    problem._portfolioWinner and its expanded node count in
+    problem._expanded.
+    """
+    if configurations is None:
+        configurations = portfolioConfigurations(heuristic)
+    if processes is None:
+        processes = len(configurations)
+    if deadline is not None:
+        deadline = time.time() + deadline
+
+    results = multiprocessing.Queue()
+    pending = range(len(configurations))
+    running = {}
+    fallback = None
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                index = pending.pop(0)
+                worker = multiprocessing.Process(target=runConfiguration,
+                                                 args=(index, configurations[index][1], problem, results))
+                worker.daemon = True
+                worker.start()
+                running[index] = worker
+            if deadline is not None and time.time() >= deadline:
+                break
+            try:
+                # a short wait, so that alarms and the deadline are noticed
+                index, actions, expanded, error = results.get(timeout=0.05)
+            except Queue.Empty:
+                for index, worker in running.items():
+                    if not worker.is_alive() and worker.exitcode != 0:
+                        del running[index]  # killed before it could report
+                continue
+            running.pop(index).join()
+            name, searchFunction, isOptimal = configurations[index]
+            if error is not None:
+                print '[portfolioSearch] %s failed:\n%s' % (name, error.rstrip())
+            if not actions:
+                continue
+            if isOptimal or not optimal:
+                problem._portfolioWinner, problem._expanded = name, expanded
+                return actions
+            if fallback is None:
+                fallback = (name, actions, expanded)
+    finally:
+        for worker in running.values():
+            worker.terminate()
+            worker.join()
+    if fallback is None:
+        return []
+    problem._portfolioWinner, actions, problem._expanded = fallback
+    return actions
+
+
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+iddfs = iterativeDeepeningSearch
+bidirectional = bidirectionalSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = simplifiedMemoryBoundedAStarSearch
+jps = jumpPointSearch
+arastar = anytimeRepairingAStarSearch
+beam = beamSearch
+portfolio = portfolioSearch
+field = distanceFieldSearch
@@ -37,6 +37,7 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import getMazeGraph
 import util
 import time
 import search
@@ -58,6 +59,11 @@ class GoWestAgent(Agent):
 #       after you fill in parts of search.py          #
 #######################################################
 
+# the options of SearchAgent which are handed on to the search function, and
+# how each is converted from its text on the command line
+SEARCH_OPTIONS = {'deadline': float, 'width': int, 'optimal': lambda text: text == 'True'}
+
+
 class SearchAgent(Agent):
     """
     This very general search agent finds a path using a supplied search
@@ -71,18 +77,43 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    With cacheSize above 0, the values of the heuristic are memoized per
+    search in a search.HeuristicCache of at most cacheSize states. It only
+    pays off for searches which evaluate a state more than once, such as
+    idastar and beam; A* evaluates every state once, so it is off by
+    default.
+
+    Anytime searches such as arastar take a deadline in seconds, after which
+    they return the best path found so far.
+
+    Beam search (beam) takes the width of its beam, e.g.
+    -a fn=beam,heuristic=manhattanHeuristic,width=20
+
+    Portfolio search (portfolio) runs several searches in parallel and
+    returns the first plan, or with optimal=True the first optimal one.
+
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', cacheSize=0,
+                 deadline=None, width=None, optimal=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError, fn + ' is not a search function in search.py.'
         func = getattr(search, fn)
-        if 'heuristic' not in func.func_code.co_varnames:
+        options = {}
+        for name, value in [('deadline', deadline), ('width', width), ('optimal', optimal)]:
+            if value == None: continue
+            if name not in getattr(search, fn).func_code.co_varnames:
+                raise AttributeError, fn + ' does not take the option ' + name + '.'
+            print('[SearchAgent] using %s=%s' % (name, value))
+            options[name] = SEARCH_OPTIONS[name](value)
+        if options:
+            func = lambda x, searchFn=func, **kwargs: searchFn(x, **dict(options, **kwargs))
+        if 'heuristic' not in getattr(search, fn).func_code.co_varnames:
             print('[SearchAgent] using function ' + fn)
             self.searchFunction = func
         else:
@@ -94,7 +125,15 @@ class SearchAgent(Agent):
                 raise AttributeError, heuristic + ' is not a function in searchAgents.py or search.py.'
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            # With a cacheSize, every search gets its own bounded cache of heuristic values
+            cacheSize = int(cacheSize)
+
+            def searchFunction(x):
+                if cacheSize <= 0:
+                    return func(x, heuristic=heur)
+                self.heuristicCache = search.HeuristicCache(heur, cacheSize)
+                return func(x, heuristic=self.heuristicCache)
+            self.searchFunction = searchFunction
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -114,10 +153,32 @@ class SearchAgent(Agent):
         if self.searchFunction == None: raise Exception, "No search function provided for SearchAgent"
         starttime = time.time()
         problem = self.searchType(state)  # Makes a new search problem
-        self.actions = self.searchFunction(problem)  # Find a path
+        if 'display' in dir(self) and 'drawExpandedCells' in dir(self.display) and 'observer' in dir(problem):
+            problem.observer = ExpandedCellsObserver(self.display)
+        if search.statisticsFile != None:
+            statistics = search.SearchStatistics()
+            self.actions = statistics.profile(self.searchFunction, problem)  # Find a path
+            print statistics
+            statistics.dump(search.statisticsFile)
+        else:
+            self.actions = self.searchFunction(problem)  # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if '_portfolioWinner' in dir(problem): print('Plan found by %s' % problem._portfolioWinner)
+        if '_peakNodes' in dir(problem): print('Peak search nodes in memory: %d' % problem._peakNodes)
+        if '_suboptimalityBound' in dir(problem):
+            print('Path cost is at most %.2f times the optimal cost' % problem._suboptimalityBound)
+        if 'heuristicCache' in dir(self):
+            print('Heuristic cache hits: %d, misses: %d' % (self.heuristicCache.hits, self.heuristicCache.misses))
+
+    def setDisplay(self, display):
+        """
+        Called by pacman.py with the display of every game before it starts.
+        The cells the search expands are drawn on a display which can draw
+        them, and not recorded at all otherwise (e.g. with -q).
+        """
+        self.display = display
 
     def getAction(self, state):
         """
@@ -136,6 +197,27 @@ class SearchAgent(Agent):
             return Directions.STOP
 
 
+class ExpandedCellsObserver(search.SearchObserver):
+    """
+    Records the cells a search expands, in the order it first expands them,
+    and draws them on the display when the search reaches the goal.
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.cells = []
+        self.seen = set()
+
+    def expanded(self, state):
+        if state not in self.seen:
+            self.seen.add(state)
+            self.cells.append(state)
+
+    def reachedGoal(self, state):
+        self.cells.append(state)
+        self.display.drawExpandedCells(self.cells)
+
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -147,40 +229,35 @@ class PositionSearchProblem(search.SearchProblem):
     Note: this search problem is fully specified; you should NOT change it.
     """
 
-    def __init__(self, gameState, costFn=lambda x: 1, goal=(1, 1), start=None, warn=True, visualize=True):
+    def __init__(self, gameState, costFn=lambda x: 1, goal=(1, 1), start=None, warn=True, observer=None):
         """
         Stores the start and goal.
 
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        observer: A search.SearchObserver told of every expansion and of the
+                  goal, or None
         """
         self.walls = gameState.getWalls()
+        self.graph = getMazeGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
         self.costFn = costFn
-        self.visualize = visualize
+        self.observer = observer
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
-        # For display purposes
-        self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
+        self._expanded = 0  # DO NOT CHANGE
 
     def getStartState(self):
         return self.startState
 
     def isGoalState(self, state):
         isGoal = state == self.goal
-
-        # For display purposes only
-        if isGoal and self.visualize:
-            self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display):  # @UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist)  # @UndefinedVariable
-
+        if isGoal and self.observer != None:
+            self.observer.reachedGoal(state)
         return isGoal
 
     def getSuccessors(self, state):
@@ -195,24 +272,28 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append((nextState, action, cost))
+        graph = self.graph
+        successors = [(nextState, action, self.costFn(nextState))
+                      for nextState, action in graph.cellMoves[state[0] * graph.height + state[1]]]
 
-        # Bookkeeping for display purposes
         self._expanded += 1  # DO NOT CHANGE
-        if state not in self._visited:
-            self._visited[state] = True
-            self._visitedlist.append(state)
+        if self.observer != None:
+            self.observer.expanded(state)
 
         return successors
 
+    def getPredecessors(self, state):
+        """
+        Returns the states from which state can be reached, the actions that
+        lead from them to state and the cost of stepping into state.
+
+        Every move on the board can be undone, so the predecessors are the
+        successors with reversed actions.
+        """
+        cost = self.costFn(state)
+        return [(predecessor, Actions.reverseDirection(action), cost)
+                for predecessor, action, _ in self.getSuccessors(state)]
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -280,7 +361,8 @@ class CornersProblem(search.SearchProblem):
     """
     This search problem finds paths through all four corners of a layout.
 
-    You must select a suitable state space and successor function
+    A search state is a tuple ( pacmanPosition, cornerMask ) where bit i of
+    the integer cornerMask is set while corners[i] has not been visited.
     """
 
     def __init__(self, startingGameState):
@@ -297,19 +379,25 @@ class CornersProblem(search.SearchProblem):
         self._expanded = 0  # DO NOT CHANGE; Number of search nodes expanded
         # Please add any code here which you would like to use
         # in initializing the problem
+        self.cornerBits = dict((corner, 1 << i) for i, corner in enumerate(self.corners))
+        self.graph = getMazeGraph(self.walls)
+        # the moves out of every cell of the graph with the corner bit of the cell each leads to
+        self.cellMoves = [[(position, self.cornerBits.get(position, 0), action) for position, action in moves]
+                          for moves in self.graph.cellMoves]
+        self.heuristicInfo = {}  # for cornersHeuristic, see getCornerTours
 
     def getStartState(self):
         """
         Returns the start state (in your state space, not the full Pacman state
         space)
         """
-        return self.startingPosition, self.corners
+        return self.startingPosition, (1 << len(self.corners)) - 1
 
     def isGoalState(self, state):
         """
         Returns whether this search state is a goal state of the problem.
         """
-        return not state[1]
+        return state[1] == 0
 
     def getSuccessors(self, state):
         """
@@ -322,33 +410,10 @@ class CornersProblem(search.SearchProblem):
             is the incremental cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            #   x,y = currentPosition
-            #   dx, dy = Actions.directionToVector(action)
-            #   nextx, nexty = int(x + dx), int(y + dy)
-            #   hitsWall = self.walls[nextx][nexty]
-
-            x, y = state[0]
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            hitsWall = self.walls[nextx][nexty]
-
-            if not hitsWall:
-                nextPosition = (nextx, nexty)
-
-                if nextPosition in state[1]:
-                    nextCorners = state[1][:]
-                    nextCorners.remove(nextPosition)
-                    corners = nextCorners
-                else:
-                    corners = state[1]
-                successors.append(((nextPosition, corners), action, 1))
-
+        (x, y), corners = state
+        i = x * self.graph.height + y
         self._expanded += 1  # DO NOT CHANGE
-        return successors
+        return [((nextPosition, corners & ~bit), action, 1) for nextPosition, bit, action in self.cellMoves[i]]
 
     def getCostOfActions(self, actions):
         """
@@ -363,6 +428,33 @@ class CornersProblem(search.SearchProblem):
             if self.walls[x][y]: return 999999
         return len(actions)
 
+    def getCornerTours(self):
+        """
+        Returns, as a list indexed by corner and then by corner mask, the
+        length of the shortest walk from that corner through every corner of
+        the mask in true maze distances (Held-Karp over the subsets of the
+        four corners). Computed once per problem.
+        """
+        if 'cornerTours' not in self.heuristicInfo:
+            import mazeDistances
+            distances = mazeDistances.getMazeDistances(self.walls)
+            self.heuristicInfo['mazeDistances'] = distances
+            count = len(self.corners)
+            between = [[distances.getDistance(a, b) if a in distances.ids and b in distances.ids else float('inf')
+                        for b in self.corners] for a in self.corners]
+            tours = [[float('inf')] * (1 << count) for corner in self.corners]
+            for first in range(count):
+                tours[first][0] = 0
+            # smaller masks first, so that every mask can use the ones it contains
+            for mask in sorted(range(1, 1 << count), key=lambda mask: bin(mask).count('1')):
+                for first in range(count):
+                    if not mask & (1 << first):
+                        tours[first][mask] = min(between[first][other] + tours[other][mask & ~(1 << other)]
+                                                 for other in range(count) if mask & (1 << other))
+            self.heuristicInfo['cornerTours'] = tours
+            self.heuristicInfo['cornersFrom'] = {}
+        return self.heuristicInfo['cornerTours']
+
 
 def cornersHeuristic(state, problem):  ##6 zad
     """
@@ -379,27 +471,23 @@ def cornersHeuristic(state, problem):  ##6 zad
     """
     corners = problem.corners  # These are the corner coordinates
     walls = problem.walls  # These are the walls of the maze, as a Grid (game.py)
-    current = state[0]
-    remainingCorners = state[1][:]  # state is successor[0], tuple of (coordinates, nextCorners)
-
-    if remainingCorners == []:
-        return 0
-
-    pac = current
-    sum = 0
-    while remainingCorners:
-        pc = util.PriorityQueue()
-        for rc in remainingCorners:
-            pc.push(rc, manh(pac, rc))
-        favCorner = pc.pop()
-        sum += manh(pac, favCorner)
-        pac = favCorner
-        remainingCorners.remove(favCorner)
-    return sum
-
-
-def manh(current, goal):
-    return abs(current[0] - goal[0]) + abs(current[1] - goal[1])
+    position, cornerMask = state
+
+    # the exact length of the shortest walk through the remaining corners:
+    # the best first corner plus the tour from it, tabled for every mask the
+    # first time a position is seen
+    tours = problem.getCornerTours()
+    cornersFrom = problem.heuristicInfo['cornersFrom']
+    if position not in cornersFrom:
+        distances = problem.heuristicInfo['mazeDistances']
+        toCorners = [distances.getDistance(position, corner) if corner in distances.ids else float('inf')
+                     for corner in corners]
+        table = [0] * (1 << len(corners))
+        for mask in range(1, 1 << len(corners)):
+            table[mask] = min(toCorners[i] + tours[i][mask & ~(1 << i)]
+                              for i in range(len(corners)) if mask & (1 << i))
+        cornersFrom[position] = table
+    return cornersFrom[position][cornerMask]
 
 
 class AStarCornersAgent(SearchAgent):
@@ -415,37 +503,53 @@ class FoodSearchProblem:
     A search problem associated with finding the a path that collects all of the
     food (dots) in a Pacman game.
 
-    A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
+    A search state in this problem is a tuple ( pacmanPosition, foodMask ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodMask:       an integer with bit i set while the food at foodCells[i]
+                      (the food of the starting state) is left
+
+    Unlike a Grid, the mask hashes in O(1) and a successor's food costs one
+    integer operation. getFoodGrid converts a state's food to a Grid for code
+    that needs one.
     """
 
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        food = startingGameState.getFood()
+        self.foodCells = food.asList()
+        self.foodBits = dict((cell, 1 << i) for i, cell in enumerate(self.foodCells))
+        self.start = (startingGameState.getPacmanPosition(), (1 << len(self.foodCells)) - 1)
         self.walls = startingGameState.getWalls()
         self.startingGameState = startingGameState
         self._expanded = 0  # DO NOT CHANGE
         self.heuristicInfo = {}  # A dictionary for the heuristic to store information
+        self.graph = getMazeGraph(self.walls)
+        # the moves out of every cell of the graph with the food bit of the cell each leads to
+        self.cellMoves = [[(position, self.foodBits.get(position, 0), action) for position, action in moves]
+                          for moves in self.graph.cellMoves]
 
     def getStartState(self):
         return self.start
 
     def isGoalState(self, state):
-        return state[1].count() == 0
+        return state[1] == 0
 
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
-        successors = []
         self._expanded += 1  # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append((((nextx, nexty), nextFood), direction, 1))
-        return successors
+        (x, y), food = state
+        i = x * self.graph.height + y
+        return [((nextPosition, food & ~bit), action, 1) for nextPosition, bit, action in self.cellMoves[i]]
+
+    def getFood(self, state):
+        "The positions of the food left in a state"
+        return [cell for i, cell in enumerate(self.foodCells) if state[1] >> i & 1]
+
+    def getFoodGrid(self, state):
+        "The food left in a state as a Grid of booleans"
+        grid = self.startingGameState.getFood().copy()
+        for cell in self.foodCells:
+            grid[cell[0]][cell[1]] = bool(state[1] & self.foodBits[cell])
+        return grid
 
     def getCostOfActions(self, actions):
         """Returns the cost of a particular sequence of actions.  If those actions
@@ -463,10 +567,25 @@ class FoodSearchProblem:
 
 
 class AStarFoodSearchAgent(SearchAgent):
-    "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
+    """
+    A SearchAgent for FoodSearchProblem using A* and your foodHeuristic
 
-    def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
+    fn can also name one of the memory-bounded variants of A*, idastar or
+    smastar, which take the node budget maxNodes:
+
+    > python pacman.py -l trickySearch -p AStarFoodSearchAgent -a fn=smastar,maxNodes=5000
+    """
+
+    def __init__(self, fn='aStarSearch', maxNodes=None):
+        if fn not in dir(search):
+            raise AttributeError, fn + ' is not a search function in search.py.'
+        func = getattr(search, fn)
+        if maxNodes == None:
+            self.searchFunction = lambda prob: func(prob, foodHeuristic)
+        else:
+            if 'maxNodes' not in func.func_code.co_varnames:
+                raise AttributeError, fn + ' does not take a node budget.'
+            self.searchFunction = lambda prob: func(prob, foodHeuristic, maxNodes=int(maxNodes))
         self.searchType = FoodSearchProblem
 
 
@@ -483,9 +602,10 @@ def foodHeuristic(state, problem):
     other hand, inadmissible or inconsistent heuristics may find optimal
     solutions, so be careful.
 
-    The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a Grid
-    (see game.py) of either True or False. You can call foodGrid.asList() to get
-    a list of food coordinates instead.
+    The state is a tuple ( pacmanPosition, foodMask ) where foodMask is an
+    integer bitmask over problem.foodCells (see FoodSearchProblem). You can call
+    problem.getFood(state) to get a list of food coordinates, or
+    problem.getFoodGrid(state) to get a Grid of either True or False instead.
 
     If you want access to info like walls, capsules, etc., you can query the
     problem.  For example, problem.walls gives you a Grid of where the walls
@@ -498,19 +618,26 @@ def foodHeuristic(state, problem):
     Subsequent calls to this heuristic can access
     problem.heuristicInfo['wallCount']
     """
-    position, foodGrid = state
-    maxDistance = 0
-
-    if foodGrid.asList() == []:
+    position, foodMask = state
+    if foodMask == 0:
         return 0
 
-    if len(foodGrid.asList()) is 1:
-        return manh(position, foodGrid.asList()[0])
-
-    for food in foodGrid.asList():
-        dist = manh(position, food)
-        maxDistance = dist if dist > maxDistance else maxDistance
-    return maxDistance
+    # the maze distance to the farthest food: the food bits of every position
+    # are sorted farthest first, so the first one still set gives the answer
+    if 'farthestFood' not in problem.heuristicInfo:
+        problem.heuristicInfo['farthestFood'] = {}
+    farthestFood = problem.heuristicInfo['farthestFood']
+    if position not in farthestFood:
+        import mazeDistances
+        if 'mazeDistances' not in problem.heuristicInfo:
+            problem.heuristicInfo['mazeDistances'] = mazeDistances.getMazeDistances(problem.walls)
+        distances = problem.heuristicInfo['mazeDistances'].getDistances(position, problem.foodCells).tolist()
+        distances = [float('inf') if distance == mazeDistances.UNREACHABLE else distance for distance in distances]
+        farthestFood[position] = sorted(zip(distances, [problem.foodBits[cell] for cell in problem.foodCells]),
+                                        reverse=True)
+    for distance, bit in farthestFood[position]:
+        if foodMask & bit:
+            return distance
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
@@ -565,9 +692,11 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.graph = getMazeGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
-        self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
+        self.observer = None
+        self._expanded = 0  # DO NOT CHANGE
 
     def isGoalState(self, state):
         """
@@ -819,3 +819,64 @@ class CornerHeuristicPacman(testClasses.TestCase):
         handle.close()
         return True
 
+class MemoryBoundedSearchTest(testClasses.TestCase):
+    """
+    Runs a search which takes a node budget on a pacman layout with the
+    manhattan heuristic. The search must return the solution (empty when the
+    optimal path does not fit in the budget) within the time limit.
+    """
+
+    def __init__(self, question, testDict):
+        super(MemoryBoundedSearchTest, self).__init__(question, testDict)
+        self.layout_text = testDict['layout']
+        self.alg = testDict['algorithm']
+        self.layoutName = testDict['layoutName']
+        self.maxNodes = int(testDict['maxNodes'])
+        self.timeLimit = float(testDict.get('timeLimit', '1'))
+
+    def getSolInfo(self, search, searchAgents):
+        import time
+        alg = getattr(search, self.alg)
+        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        start_state = pacman.GameState()
+        start_state.initialize(lay, 0)
+        problem = searchAgents.PositionSearchProblem(start_state, warn=False)
+        start = time.time()
+        solution = alg(problem, searchAgents.manhattanHeuristic, maxNodes=self.maxNodes)
+        return solution, time.time() - start
+
+    def execute(self, grades, moduleDict, solutionDict):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        gold_solution = str.split(solutionDict['solution'])
+
+        solution, elapsed = self.getSolInfo(search, searchAgents)
+        if solution != gold_solution:
+            grades.addMessage('FAIL: %s' % self.path)
+            grades.addMessage('Solution not correct with a budget of %d nodes.' % self.maxNodes)
+            grades.addMessage('\tstudent solution:\n%s' % wrap_solution(solution))
+            grades.addMessage('\tcorrect solution:\n%s' % wrap_solution(gold_solution))
+            return False
+
+        if elapsed > self.timeLimit:
+            grades.addMessage('FAIL: %s' % self.path)
+            grades.addMessage('Search took %.1f seconds, more than the limit of %.1f.' % (elapsed, self.timeLimit))
+            return False
+
+        grades.addMessage('PASS: %s' % self.path)
+        grades.addMessage('\tpacman layout:\t\t%s' % self.layoutName)
+        grades.addMessage('\tnode budget:\t\t%d' % self.maxNodes)
+        grades.addMessage('\tsolution length: %s' % len(solution))
+        return True
+
+    def writeSolution(self, moduleDict, filePath):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# An empty solution means the optimal path does not fit in the budget.\n')
+        solution, elapsed = self.getSolInfo(search, searchAgents)
+        handle.write('solution: """\n%s\n"""\n' % wrap_solution(solution))
+        handle.close()
+        return True
+
@@ -134,6 +134,9 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
     def reversed_stack(self):
         return self.list.reverse(self.list);
 
@@ -157,6 +160,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -205,6 +211,143 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class IndexedPriorityQueue:
+    """
+      Implements a binary heap which, unlike PriorityQueue, keeps an index
+      from the key of every queued item to its position in the heap. This
+      makes it possible to check whether an item is queued and to lower its
+      priority in O(log n), so every key is present in the heap at most once.
+
+      The key of an item is computed by the key function (by default the item
+      itself). Ties between equal priorities are broken in favour of the item
+      which was pushed or updated first.
+    """
+    def  __init__(self, key=lambda item: item):
+        self.heap = []
+        self.index = {}
+        self.count = 0
+        self.key = key
+
+    def push(self, item, priority):
+        """
+          Pushes the item, or updates it if an item with the same key is
+          already queued with a higher priority. Returns False if the queued
+          item was kept because its priority is not higher.
+        """
+        key = self.key(item)
+        if key in self.index:
+            if self.heap[self.index[key]][0] <= priority:
+                return False
+            self.decreaseKey(item, priority)
+            return True
+        entry = [priority, self.count, key, item]
+        self.count += 1
+        self.index[key] = len(self.heap)
+        self.heap.append(entry)
+        self._siftUp(len(self.heap) - 1)
+        return True
+
+    update = push
+
+    def decreaseKey(self, item, priority):
+        "Replaces the queued item having the same key and lowers its priority"
+        key = self.key(item)
+        i = self.index[key]
+        entry = self.heap[i]
+        if priority > entry[0]:
+            raise ValueError, "new priority %s is higher than %s" % (priority, entry[0])
+        entry[0], entry[1], entry[3] = priority, self.count, item
+        self.count += 1
+        self._siftUp(i)
+
+    def remove(self, item):
+        "Removes the queued item having the same key, if there is one"
+        key = self.key(item)
+        if key not in self.index:
+            return
+        i = self.index.pop(key)
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.index[last[2]] = i
+            self._siftUp(i)
+            self._siftDown(self.index[last[2]])
+
+    def contains(self, item):
+        "Returns true if an item with the same key is queued"
+        return self.key(item) in self.index
+
+    def peek(self):
+        "Returns the item with the lowest priority without removing it"
+        return self.heap[0][3]
+
+    def getPriority(self, item):
+        "Returns the priority of the queued item having the same key"
+        return self.heap[self.index[self.key(item)]][0]
+
+    def pop(self):
+        heap = self.heap
+        last = heap.pop()
+        if heap:
+            entry = heap[0]
+            heap[0] = last
+            self.index[last[2]] = 0
+            self._siftDown(0)
+        else:
+            entry = last
+        del self.index[entry[2]]
+        return entry[3]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, i):
+        heap, index = self.heap, self.index
+        entry = heap[i]
+        while i > 0:
+            parentIndex = (i - 1) >> 1
+            parent = heap[parentIndex]
+            if not entry < parent: break
+            heap[i] = parent
+            index[parent[2]] = i
+            i = parentIndex
+        heap[i] = entry
+        index[entry[2]] = i
+
+    def _siftDown(self, i):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= size: break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry: break
+            heap[i] = heap[child]
+            index[heap[i][2]] = i
+            i = child
+        heap[i] = entry
+        index[entry[2]] = i
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    An IndexedPriorityQueue with the same push/pop signature as the Queue and
+    the Stack classes, like PriorityQueueWithFunction.
+    """
+    def  __init__(self, priorityFunction, key=lambda item: item):
+        "priorityFunction (item) -> priority, key (item) -> hashable key"
+        self.priorityFunction = priorityFunction
+        IndexedPriorityQueue.__init__(self, key)
+
+    def push(self, item):
+        "Pushes or updates the item with priority from the priority function"
+        return IndexedPriorityQueue.push(self, item, self.priorityFunction(item))
+
+
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
@@ -22,6 +22,7 @@
 
 from util import *
 import time, os
+import array
 import traceback
 import sys
 
@@ -351,15 +352,7 @@ class Actions:
     def getLegalNeighbors(position, walls):
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
-        neighbors = []
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_x = x_int + dx
-            if next_x < 0 or next_x == walls.width: continue
-            next_y = y_int + dy
-            if next_y < 0 or next_y == walls.height: continue
-            if not walls[next_x][next_y]: neighbors.append((next_x, next_y))
-        return neighbors
+        return getMazeGraph(walls).getLegalNeighbors((x_int, y_int))
     getLegalNeighbors = staticmethod(getLegalNeighbors)
 
     def getSuccessor(position, action):
@@ -368,6 +361,77 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class MazeGraph:
+    """
+    The moves between the cells of a wall Grid in compressed sparse row form,
+    built once per walls by getMazeGraph. Cell (x, y) has the id
+    x * height + y, and the moves out of cell i are
+    moves[offsets[i]:offsets[i + 1]]: (next position, action) pairs in the
+    order north, south, east, west, in which the search problems have always
+    listed their successors. targets and actionCodes hold the same moves as
+    the ids of the next cells and indices into ACTIONS.
+
+    Wall cells have moves as well, to the open cells next to them.
+    """
+    ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.wallCells = [column[:] for column in walls.data]
+        self.offsets = array.array('i', [0])
+        self.targets = array.array('i')
+        self.actionCodes = array.array('b')
+        self.moves = []
+        for x in range(self.width):
+            for y in range(self.height):
+                for code, action in enumerate(MazeGraph.ACTIONS):
+                    dx, dy = Actions._directions[action]
+                    nextx, nexty = x + dx, y + dy
+                    if 0 <= nextx < self.width and 0 <= nexty < self.height and not walls[nextx][nexty]:
+                        self.targets.append(nextx * self.height + nexty)
+                        self.actionCodes.append(code)
+                        self.moves.append(((nextx, nexty), action))
+                self.offsets.append(len(self.moves))
+        # the slices of moves, cut once; the search problems read these
+        self.cellMoves = [self.moves[self.offsets[i]:self.offsets[i + 1]] for i in range(len(self.offsets) - 1)]
+        self._legalNeighbors = {}
+
+    def getMoves(self, position):
+        """
+        The (next position, action) pairs of the moves out of a cell. The list
+        is shared, so it must not be changed.
+        """
+        return self.cellMoves[position[0] * self.height + position[1]]
+
+    def getLegalNeighbors(self, position):
+        """
+        The cells Actions.getLegalNeighbors gives for a cell: the open ones
+        around it and the cell itself if it is open, in the order of
+        Actions._directionsAsList. Worked out once per cell.
+        """
+        if position not in self._legalNeighbors:
+            x, y = position
+            neighbors = []
+            for direction, (dx, dy) in Actions._directionsAsList:
+                nextx, nexty = x + dx, y + dy
+                if 0 <= nextx < self.width and 0 <= nexty < self.height and not self.wallCells[nextx][nexty]:
+                    neighbors.append((nextx, nexty))
+            self._legalNeighbors[position] = neighbors
+        return list(self._legalNeighbors[position])
+
+def getMazeGraph(walls):
+    """
+    The MazeGraph of a wall Grid. It is built the first time it is asked for
+    and kept on the Grid, so the graph of a Layout's walls lives as long as
+    the Layout. Walls are not changed once the layout is read; a Grid which
+    is changed afterwards must be copied to get a graph of its new cells.
+    """
+    graph = walls.__dict__.get('_mazeGraph')
+    if graph == None:
+        graph = walls._mazeGraph = MazeGraph(walls)
+    return graph
+
 class GameStateData:
     """
 
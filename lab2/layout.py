@@ -13,7 +13,7 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, getMazeGraph
 import os
 import random
 
@@ -61,6 +61,10 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def getMazeGraph(self):
+        "The MazeGraph of the walls, built once and kept with them"
+        return getMazeGraph(self.walls)
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -1,6 +1,7 @@
 from game import Directions
 from game import Agent
 from game import Actions
+from game import getMazeGraph
 import util
 import time
 import logic
@@ -42,11 +43,21 @@ class PacardAgent(Agent):
         if self.searchFunction == None: raise Exception, "No search function provided for PacardAgent"
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
+        if 'display' in dir(self) and 'drawExpandedCells' in dir(self.display) and 'observer' in dir(problem):
+            problem.observer = ExpandedCellsObserver(self.display)
         self.actions  = self.searchFunction(problem) # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
 
+    def setDisplay(self, display):
+        """
+        Called by pacman.py with the display of every game before it starts.
+        The cells the search expands are drawn on a display which can draw
+        them, and not recorded at all otherwise (e.g. with -q).
+        """
+        self.display = display
+
     def getAction(self, state):
         """
         Returns the next action in the path chosen earlier (in
@@ -64,6 +75,27 @@ class PacardAgent(Agent):
             return Directions.STOP
 
 
+class ExpandedCellsObserver(search.SearchObserver):
+    """
+    Records the cells a search expands, in the order it first expands them,
+    and draws them on the display when the search reaches the goal.
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.cells = []
+        self.seen = set()
+
+    def expanded(self, state):
+        if state not in self.seen:
+            self.seen.add(state)
+            self.cells.append(state)
+
+    def reachedGoal(self, state):
+        self.cells.append(state)
+        self.display.drawExpandedCells(self.cells)
+
+
 class LogicSearchProblem(pacard.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -75,15 +107,18 @@ class LogicSearchProblem(pacard.SearchProblem):
     Note: this search problem is fully specified; you should NOT change it.
     """
 
-    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
+    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, observer=None):
         """
         Stores the start and goal.
 
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        observer: A search.SearchObserver told of every expansion and of the
+                  goal, or None
         """
         self.walls = gameState.getWalls()
+        self.graph = getMazeGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         self.capsules = gameState.getCapsules()
         
@@ -104,25 +139,17 @@ class LogicSearchProblem(pacard.SearchProblem):
         self.goal = food.asList()[0]
 
         self.costFn = costFn
-        self.visualize = visualize
+        self.observer = observer
 
-        # For display purposes
-        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self._expanded = 0 # DO NOT CHANGE
 
     def getStartState(self):
         return self.startState
 
     def isGoalState(self, state):
         isGoal = state == self.goal
-
-        # For display purposes only
-        if isGoal and self.visualize:
-            self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist) #@UndefinedVariable
-
+        if isGoal and self.observer != None:
+            self.observer.reachedGoal(state)
         return isGoal
 
     def getSuccessors(self, state):
@@ -137,21 +164,13 @@ class LogicSearchProblem(pacard.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        graph = self.graph
+        successors = [(nextState, action, self.costFn(nextState))
+                      for nextState, action in graph.cellMoves[state[0] * graph.height + state[1]]]
 
-        # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
-        if state not in self._visited:
-            self._visited[state] = True
-            self._visitedlist.append(state)
+        if self.observer != None:
+            self.observer.expanded(state)
 
         return successors
 
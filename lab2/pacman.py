@@ -629,9 +629,6 @@ def replayGame( layout, actions, display ):
     display.finish()
 
 def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
-    import __main__
-    __main__.__dict__['_display'] = display
-
     rules = ClassicGameRules(timeout)
     games = []
 
@@ -645,6 +642,9 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
+        # agents which draw on the display (e.g. the cells a search expanded) are told which it is
+        if 'setDisplay' in dir(pacman):
+            pacman.setDisplay(gameDisplay)
         game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
         game.run()
         if not beQuiet: games.append(game)
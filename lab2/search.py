@@ -1,10 +1,10 @@
 import util
-import copy
 
 from util import Queue
 from game import Directions
 from game import Agent
 from game import Actions
+from game import getMazeGraph
 
 class SearchNode:
     """
@@ -42,12 +42,13 @@ class SearchNode:
         Reconstruct a path to the initial state from the current node.
         """
         moves = []
-        
-        node = copy.deepcopy(self)
-        while node.parent is not None: 
-            moves.insert(0, node.transition)
+
+        node = self
+        while node.parent is not None:
+            moves.append(node.transition)
             node = node.parent
 
+        moves.reverse()
         return moves
 
 
@@ -91,6 +92,27 @@ def constrainedBreadthFirstSearch(problem, legalStates):
 
 
 
+class SearchObserver:
+    """
+    Receives the events of a search problem it is given to, e.g. to draw the
+    cells a search expanded (see logicAgents.ExpandedCellsObserver). Without
+    one the problems keep no record of the search beyond their _expanded
+    count.
+    """
+
+    def expanded(self, state):
+        """
+        Called every time the problem returns the successors of a state.
+        """
+        pass
+
+    def reachedGoal(self, state):
+        """
+        Called when the problem finds that a state is a goal.
+        """
+        pass
+
+
 class PositionSearchProblem():
     """
     A search problem defines the state space, start state, goal test, successor
@@ -101,40 +123,35 @@ class PositionSearchProblem():
 
     """
 
-    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
+    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, observer=None):
         """
         Stores the start and goal.
 
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        observer: A search.SearchObserver told of every expansion and of the
+                  goal, or None
         """
         self.walls = gameState.getWalls()
+        self.graph = getMazeGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
         self.costFn = costFn
-        self.visualize = visualize
+        self.observer = observer
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
-        # For display purposes
-        self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self._expanded = 0 # DO NOT CHANGE
 
     def getStartState(self):
         return self.startState
 
     def isGoalState(self, state):
         isGoal = state == self.goal
-
-        # For display purposes only
-        if isGoal and self.visualize:
-            self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist) #@UndefinedVariable
-
+        if isGoal and self.observer != None:
+            self.observer.reachedGoal(state)
         return isGoal
 
     def getSuccessors(self, state):
@@ -148,21 +165,13 @@ class PositionSearchProblem():
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        graph = self.graph
+        successors = [(nextState, action, self.costFn(nextState))
+                      for nextState, action in graph.cellMoves[state[0] * graph.height + state[1]]]
 
-        # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
-        if state not in self._visited:
-            self._visited[state] = True
-            self._visitedlist.append(state)
+        if self.observer != None:
+            self.observer.expanded(state)
 
         return successors
 
@@ -197,5 +206,5 @@ def pathBetween(point1, point2, legalStates, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
+    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
     return constrainedBreadthFirstSearch(prob, legalStates)